@@ -0,0 +1,470 @@
+# /// script
+# requires-python = ">=3.12"
+# dependencies = [
+#   "scikit-learn",
+#   "regex",
+#   "spacy",
+#   "numpy",
+#   "matplotlib",
+# ]
+# ///
+
+# Benchmarks and correctness checks for QuickNLPFreqTool
+# Russian and English corpora are generated from a fixed seed along with a small spaCy pipeline for them so nothing has to be downloaded
+# Run it from the directory of QuickNLPFreqTool.py, see 'python QuickNLPFreqBench.py --help'
+
+from collections import Counter # Standard library utilized for the reference frequency distribution
+import sys # Standard library utilized to report the exit code
+import os # Standard library utilized for the file paths
+import io # Standard library utilized to silence the script output while measuring
+import math # Standard library utilized for the count-min error probability
+import time # Standard library utilized to measure the stages
+import json # Standard library utilized to store the baselines
+import argparse # Standard library utilized for the command line options
+import platform # Standard library utilized to describe the machine in the baselines
+import tempfile # Standard library utilized for the stored results
+import contextlib # Standard library utilized to measure the stages
+import regex # Regular expressions (the reference text preparation)
+import numpy # Corpus generation and word vectors
+import spacy # NLP (the pipeline is made from a blank one)
+from spacy.lookups import Lookups # Lemma table of the pipeline
+import QuickNLPFreqTool as Tool # The script being measured
+
+# Benchmark settings
+BenchVersion = 1 # Increase whenever the generated corpora or pipelines change so that they are made anew
+BenchDirectory = os.path.join(Tool.CacheDirectory or tempfile.gettempdir(), 'bench') # Generated corpora and pipelines are kept here between runs
+BenchSizes = {'1mb': 1 << 20, '10mb': 10 << 20, '100mb': 100 << 20, '1gb': 1 << 30} # Corpus sizes in bytes of UTF-8
+BenchSeed = 2024 # The same seed gives the same corpora and pipelines (with the same NumPy version)
+BenchRepeats = 3 # Every stage is repeated and the fastest run is kept
+BenchTolerance = 10 # Percent a stage may be slower or take more memory than in the baseline before it's flagged
+BenchNoiseFloor = 0.05 # Seconds (and 5 MB for memory) below which differences are never flagged
+BenchCheckLimit = 4 << 20 # Largest corpus checked against the reference implementations as they hold the whole text in memory
+BenchBlockWords = 200000 # Number of words generated at once
+BenchVectorWidth = 96 # Dimensions of the generated word vectors
+BenchQueries = 8 # Number of words the similarity is calculated to
+BenchSketchSettings = {
+    'CountingCapacity': 100, # Far fewer than the distinct lemmas so the heavy hitters summary is actually reduced
+    'CountingBlockSize': 1000, # Items counted at once, the summary is reduced after every block
+    'CountMinWidth': 1024, # Few enough cells for the lemmas to collide in the count-min table
+    'NGramSegmentSize': 1000, # Word combinations counted between pruning checks, the text is split into many segments
+} # Settings of the script the approximate counting and the word combinations are checked and measured with
+BenchNGramPruneLimit = 20000 # Distinct word combinations kept while counting them with pruning
+BenchStages = ['preparation', 'parsing', 'filtering', 'counting', 'heavyhitters', 'countmin', 'combos', 'vectors', 'similarity', 'storing']
+BenchModes = {
+    'words': ['parsing', 'filtering', 'counting'],
+    'combos': ['parsing', 'filtering', 'combos'],
+    'vectors': ['parsing', 'filtering', 'counting', 'vectors', 'similarity'],
+} # Stages every mode of the script goes through, parsing includes the preparation
+
+# Synthetic languages
+# Words are made of syllables and get an ending per form, function words are taken as they are
+# Syllables with ё and diaeresis forms, hyphen variants, line ends and noise characters are there for the text preparation to deal with
+BenchLanguages = {
+    'ru': {
+        'profiles': ['ru', 'skip'],
+        'syllables': ['ка', 'ро', 'ми', 'на', 'ст', 'ло', 'ве', 'дё', 'зо', 'пу', 'бе', 'ли', 'то', 'жё', 'ры', 'ча', 'ще', 'гу', 'ёл', 'мё'],
+        'endings': {'NOUN': ['а', 'ы', 'у', 'ой', 'е'], 'VERB': ['ать', 'ает', 'али', 'ёт'], 'ADJ': ['ый', 'ая', 'ое', 'ые'], 'ADV': ['о']},
+        'function': {'PRON': ['он', 'она', 'мы', 'её'], 'ADP': ['в', 'на', 'с', 'по'], 'CCONJ': ['и', 'а', 'но'], 'PART': ['не', 'же']},
+        'noise': ['@', '#', '«', '»', '…', 'abc', '§', ' ', '№', 'x2'],
+    },
+    'en': {
+        'profiles': ['en-basic', 'en-extended', 'skip'],
+        'syllables': ['ka', 'ro', 'mi', 'ne', 'st', 'lo', 've', 'do', 'zu', 'pa', 'be', 'li', 'ta', 'er', 'qu', 'sh', 'é', 'ön'],
+        'endings': {'NOUN': ['', 's'], 'VERB': ['', 's', 'ed', 'ing'], 'ADJ': ['', 'er', 'est'], 'ADV': ['ly']},
+        'function': {'DET': ['the', 'a'], 'ADP': ['in', 'on', 'of'], 'PRON': ['he', 'she', 'it'], 'CCONJ': ['and', 'or', 'but']},
+        'noise': ['@', '#', '«', '»', '…', 'ёж', '§', ' ', 'naïve', 'x2'],
+    },
+}
+BenchLemmaCounts = {'NOUN': 800, 'VERB': 400, 'ADJ': 400, 'ADV': 150} # Number of lemmas made per part of speech
+
+def VocabularyMaking(Language, Seed): # Accepts one of the BenchLanguages keys and a number
+    'Making up the words of a synthetic language'
+    Settings = BenchLanguages[Language]
+    Generator = numpy.random.default_rng([Seed, BenchVersion, len(Language), ord(Language[0])])
+    Vocabulary, Stems = [], set()
+    for PartOfSpeech, Count in BenchLemmaCounts.items():
+        while sum(1 for Entry in Vocabulary if Entry[1] == PartOfSpeech) < Count:
+            Stem = ''.join(Generator.choice(Settings['syllables'], size=Generator.integers(1, 4)))
+            if Stem in Stems:
+                continue # Restarts the loop
+            Stems.add(Stem)
+            Forms = [Stem + Ending for Ending in Settings['endings'][PartOfSpeech]]
+            Vocabulary.append((Forms[0], PartOfSpeech, Forms))
+    for PartOfSpeech, Words in Settings['function'].items():
+        Vocabulary.extend((word, PartOfSpeech, [word]) for word in Words)
+    return Vocabulary # Returns a list of lemma, part of speech and forms
+
+def Variants(word): # Accepts a string
+    'Listing every spelling of a word the text preparation may leave'
+    Spellings = {word, word.replace('ё', 'е'), word.replace('ё', '\u0435\u0308')} # Composed, replaced and decomposed ё
+    return Spellings | {Spelling[:1].upper() + Spelling[1:] for Spelling in Spellings} # Returns set
+
+def PipelineMaking(Language, Seed, Directory): # Accepts one of the BenchLanguages keys, a number and a directory
+    'Making a small spaCy pipeline that tags and lemmatizes the synthetic language'
+    # A blank pipeline with an attribute ruler for the parts of speech, a lookup lemmatizer and random word vectors
+    # It's stored on the disk once and loaded by path the same way the script loads any model
+    Path = os.path.join(Directory, f'pipeline-{Language}-{Seed}-v{BenchVersion}')
+    if os.path.exists(os.path.join(Path, 'meta.json')):
+        return Path
+    Vocabulary = VocabularyMaking(Language, Seed)
+    NLP = spacy.blank(Language)
+    Ruler = NLP.add_pipe('attribute_ruler')
+    Tags = {}
+    for Lemma, PartOfSpeech, Forms in Vocabulary:
+        Tags.setdefault(PartOfSpeech, set()).update(Spelling.lower() for Form in Forms for Spelling in Variants(Form))
+    for PartOfSpeech, Words in Tags.items():
+        Ruler.add([[{'LOWER': {'IN': sorted(Words)}}]], {'POS': PartOfSpeech}) # A single pattern per part of speech keeps the ruler fast
+    Ruler.add([[{'IS_PUNCT': True}]], {'POS': 'PUNCT'})
+    Ruler.add([[{'LIKE_NUM': True}]], {'POS': 'NUM'})
+    Table = {}
+    for Lemma, PartOfSpeech, Forms in Vocabulary:
+        for Form in Forms:
+            for Spelling in Variants(Form):
+                Table[Spelling] = Lemma.replace('ё', 'е') if 'ё' not in Spelling and 'ё' in Form else Lemma # Prepared text has no ё, neither have its lemmas
+    Lemmatizer = NLP.add_pipe('lemmatizer', config={'mode': 'lookup'})
+    Tables = Lookups()
+    Tables.add_table('lemma_lookup', Table)
+    Lemmatizer.initialize(lookups=Tables)
+    Generator = numpy.random.default_rng([Seed, BenchVersion, 1])
+    for Lemma in sorted({Lemma for Lemma in Table.values()}):
+        NLP.vocab.set_vector(Lemma, Generator.standard_normal(BenchVectorWidth).astype(numpy.float32))
+    NLP.meta.update(name=f'bench_{Language}', version=f'{BenchVersion}.0.{Seed}')
+    NLP.to_disk(Path)
+    return Path # Returns string
+
+def CorpusGenerating(Language, Size, Seed, Directory): # Accepts one of the BenchLanguages keys, one of the BenchSizes keys, a number and a directory
+    'Writing a synthetic corpus of the selected size'
+    # Words follow Zipf's law with function words being the most frequent ones, sentences are 10 words long on average
+    # The corpus is the same for the same seed so it's generated once and reused
+    FilenameOutput = os.path.join(Directory, f'corpus-{Language}-{Size}-{Seed}-v{BenchVersion}.txt')
+    if os.path.exists(FilenameOutput):
+        return FilenameOutput
+    Settings = BenchLanguages[Language]
+    Vocabulary = VocabularyMaking(Language, Seed)
+    Generator = numpy.random.default_rng([Seed, BenchVersion, 2, ord(Language[0])])
+    Forms = [Form for Lemma, PartOfSpeech, Forms in Vocabulary for Form in Forms]
+    Ranks = Generator.permutation(len(Forms)).astype(numpy.float64)
+    Ranks[-sum(len(Words) for Words in Settings['function'].values()):] = numpy.arange(sum(len(Words) for Words in Settings['function'].values())) / 4 # Function words go first
+    Weights = 1 / (Ranks + 1) ** 1.1
+    Weights /= Weights.sum()
+    Lower = numpy.array(Forms, dtype=object)
+    Upper = numpy.array([Form[:1].upper() + Form[1:] for Form in Forms], dtype=object)
+    Decomposed = numpy.array([Form.replace('ё', '\u0435\u0308') for Form in Forms], dtype=object) # е with diaeresis
+    HasYo = numpy.array(['ё' in Form for Form in Forms])
+    Marks = numpy.array(['.', '.', '.', '!', '?', ',', ':', '...'], dtype=object)
+    Breaks = numpy.array([' ', ' ', ' ', '  ', '\n', '\r\n', '\n\n', ' \n'], dtype=object)
+    Dashes = numpy.array(list(Tool.Hyphens) + [' — ', ' - ', '--'], dtype=object)
+    Noise = numpy.array(Settings['noise'], dtype=object)
+    Written = 0
+    with open(FilenameOutput + '.part', 'wb') as fileout:
+        while Written < BenchSizes[Size]:
+            Words = Generator.choice(len(Forms), size=BenchBlockWords, p=Weights)
+            Text = Lower[Words]
+            Decomposing = HasYo[Words] & (Generator.random(BenchBlockWords) < 0.3)
+            Text[Decomposing] = Decomposed[Words[Decomposing]]
+            Starts = Generator.random(BenchBlockWords) < 0.1
+            Text[Starts] = Upper[Words[Starts]]
+            Ends = numpy.roll(Starts, -1)
+            Text[Ends] = Text[Ends] + Marks[Generator.integers(0, len(Marks), int(Ends.sum()))]
+            Noisy = Generator.random(BenchBlockWords) < 0.005
+            Text[Noisy] = Noise[Generator.integers(0, len(Noise), int(Noisy.sum()))]
+            Numbers = Generator.random(BenchBlockWords) < 0.005
+            Text[Numbers] = Generator.integers(0, 2000, int(Numbers.sum())).astype(str).astype(object)
+            Separators = numpy.full(BenchBlockWords, ' ', dtype=object)
+            Separators[Ends] = Breaks[Generator.integers(0, len(Breaks), int(Ends.sum()))]
+            Joined = ~Ends & (Generator.random(BenchBlockWords) < 0.01)
+            Separators[Joined] = Dashes[Generator.integers(0, len(Dashes), int(Joined.sum()))]
+            Block = ''.join((Text + Separators).tolist()).encode('utf-8')
+            if Written + len(Block) > BenchSizes[Size]:
+                fileout.write(Block[:Block.rfind(b' ', 0, BenchSizes[Size] - Written) + 1]) # Cuts at a word end to keep the characters whole
+                break # The corpus is as large as it gets
+            fileout.write(Block)
+            Written += len(Block)
+    os.replace(FilenameOutput + '.part', FilenameOutput) # A corpus interrupted halfway is never reused
+    return FilenameOutput # Returns string
+
+@contextlib.contextmanager
+def Measuring(Results, Stage, **Details): # Accepts a dictionary, one of the BenchStages and anything worth recording along with the measurements
+    'Measuring the time and memory a stage takes, keeping the fastest of the repeated runs'
+    Record = dict(Details)
+    Tool.RSSResetting()
+    Wall, CPU = time.perf_counter(), time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()): # The script reports its progress, the benchmark doesn't need it
+        yield Record
+    Record['wall'] = round(time.perf_counter() - Wall, 4)
+    Record['cpu'] = round(time.process_time() - CPU, 4)
+    Record['peak_rss_mb'] = Tool.PeakRSS()[0]
+    for Unit in ('chars', 'tokens', 'items'):
+        if Unit in Record and Record['wall'] >= 0.001:
+            Record[f'{Unit}_per_second'] = round(Record[Unit] / Record['wall'])
+    Best = Results.setdefault(Stage, Record)
+    Best['peak_rss_mb'] = Record['peak_rss_mb'] = max(Best['peak_rss_mb'] or 0, Record['peak_rss_mb'] or 0) # The highest memory of the runs is kept
+    if Record['wall'] < Best['wall']:
+        Results[Stage] = Record
+
+def CorpusBenchmarking(Language, Filename, ModelPath, Arguments): # Accepts one of the BenchLanguages keys, a corpus filename, a pipeline path and BenchArgumentsParsing output
+    'Measuring every selected stage on a corpus'
+    Profile = BenchLanguages[Language]['profiles'][0]
+    Stages = set(Arguments.stages)
+    Results = {}
+    NLP = Tool.NLPLoading(ModelPath)
+    for Repeat in range(Arguments.repeats):
+        if 'preparation' in Stages:
+            with Measuring(Results, 'preparation') as Record:
+                Record['chars'] = sum(len(Chunk) for Chunk in Tool.TextPreparation(Tool.TextReading(Filename), Profile))
+        with Measuring(Results, 'parsing') as Record: # Parsing is needed by every other stage so it always runs
+            ParsedText = Tool.ParsedTextCollecting(Tool.TextParsing(NLP, Tool.TextPreparation(Tool.TextReading(Filename), Profile), Arguments.processes))
+            Record['tokens'] = len(ParsedText[1])
+        with Measuring(Results, 'filtering', tokens=len(ParsedText[1])):
+            Lemmas = Tool.LemmaFiltering(ParsedText, Tool.ContentWords, Keep=True)
+        if Stages & {'counting', 'vectors', 'similarity'}:
+            with Measuring(Results, 'counting', items=len(Lemmas)):
+                SortedText = Tool.FrequencyFiltering(Lemmas, 1)
+        for Backend in ('heavyhitters', 'countmin'):
+            if Backend in Stages:
+                with Setting(BenchSketchSettings), Measuring(Results, Backend, items=len(Lemmas), capacity=BenchSketchSettings['CountingCapacity']): # With the default capacity the summaries are never reduced
+                    Tool.FrequencyFiltering(Tool.CounterMaking(Lemmas, Backend), 1)
+        if 'combos' in Stages or 'storing' in Stages:
+            with Measuring(Results, 'combos', tokens=len(Lemmas)):
+                Vocabulary, LemmaIDs = Tool.LemmaInterning(Lemmas)
+                SortedCombos = {}
+                for ComboNumber, Combos in Tool.NGramCalc(LemmaIDs, range(2, 4)):
+                    SortedCombos[ComboNumber] = Tool.FrequencyFiltering(Combos, 1, KeyDecoder=lambda Combo: tuple(Vocabulary[i] for i in Combo))
+        if Stages & {'vectors', 'similarity'}:
+            with Measuring(Results, 'vectors', items=len(SortedText)):
+                Engine = Tool.SimilarityEngine(NLP, SortedText)
+            Queries = [NLP.make_doc(word).vector for word in list(SortedText)[:BenchQueries]] # The most frequent words
+            with Measuring(Results, 'similarity', items=len(Engine[0]) * len(Queries)):
+                Tool.SimilarityCalc(Engine, Queries, Threshold=0)
+        if 'storing' in Stages:
+            with tempfile.TemporaryDirectory(prefix='QuickNLPFreqBench-') as Storing, Measuring(Results, 'storing', items=sum(len(Combos) for Combos in SortedCombos.values())): # Removed after the measurement
+                for ComboNumber, Combos in SortedCombos.items():
+                    Tool.ResultWriting(Combos, os.path.join(Storing, f'combos-{ComboNumber}.tsv'))
+                    Tool.ResultWriting(Combos, os.path.join(Storing, f'combos-{ComboNumber}.qnf'))
+        del ParsedText, Lemmas # Frees the memory before the next run
+    for Mode, ModeStages in BenchModes.items():
+        if all(Stage in Results for Stage in ModeStages):
+            Results[f'mode:{Mode}'] = {
+                'wall': round(sum(Results[Stage]['wall'] for Stage in ModeStages), 4),
+                'cpu': round(sum(Results[Stage]['cpu'] for Stage in ModeStages), 4),
+                'peak_rss_mb': max(Results[Stage]['peak_rss_mb'] or 0 for Stage in ModeStages),
+            }
+    for Stage in set(Results) & set(BenchStages) - Stages:
+        del Results[Stage] # Stages that only ran to feed the selected ones, they still count in the modes
+    return Results # Returns dictionary
+
+# Reference implementations
+# These are the ways the script calculated everything before it was optimized, kept as simple as they were to check the results against
+def ReferencePreparation(TextInput, Profile): # Accepts a string and one of the NormalizationProfiles keys
+    'Preparing the raw text the way the original regular expressions did'
+    if Profile == 'ru':
+        TextInput = regex.sub(r'[^а-яА-ЯёЁ0-9.,!?:\s\n\r\u002D\u2012\u2013\u2014\u2015\u0306\u0308]+', '', TextInput)
+    elif Profile == 'en-basic':
+        TextInput = regex.sub(r'[^a-zA-Z0-9.,!?:\s\n\r\u002D\u2012\u2013\u2014\u2015]+', '', TextInput)
+    elif Profile == 'en-extended':
+        TextInput = regex.sub(r'[^\p{Latin}0-9.,!?:\s\n\r\u002D\u2012\u2013\u2014\u2015]+', '', TextInput)
+    TextInput = regex.sub(r'[\r\n]+', ' ', TextInput) # Replaces end-of-lines with spaces
+    TextInput = regex.sub(r'[\u002D\u2012\u2013\u2014\u2015]+', '-', TextInput) # Replaces some annoying hyphen variations with a regular one
+    TextInput = regex.sub(r'\s{2,}', ' ', TextInput) # Replaces multiple spaces with a single space
+    if Profile == 'ru':
+        TextInput = TextInput.replace('ё', 'е').replace('Ё', 'Е').replace('\u0435\u0308', 'е').replace('\u0415\u0308', 'Е')
+    return TextInput # Returns string
+
+def ReferenceFrequency(TextInput, Threshold): # Accepts a list and a number
+    'Counting and sorting the way the original FrequencyCalc function did'
+    Text = Counter(TextInput)
+    KeyWords = {word: freq for word, freq in Text.items() if freq >= Threshold}
+    return dict(sorted(KeyWords.items(), key=lambda x: x[1], reverse=True)) # Returns dictionary
+
+def ReferenceCombos(TextInput, ComboNumber): # Accepts a list and a number
+    'Listing the word combinations the way the original combos mode did'
+    Combos = []
+    for i in range(len(TextInput) - (ComboNumber - 1)):
+        Combos.append(tuple(TextInput[i:i + ComboNumber]))
+    return Combos # Returns list
+
+def ReferenceSimilarity(NLP, TextInput, Query, Threshold): # Accepts a spaCy language object, a dictionary, a string and a number
+    'Calculating the similarity the way the original vectors mode did'
+    SortedWords = NLP(' '.join(TextInput.keys()))
+    WordToFindSimilarTo = NLP(Query)
+    WordSimilarOutput = {}
+    for word in SortedWords:
+        if word.vector.any() != 0:
+            WordSimilarOutput[word] = word.similarity(WordToFindSimilarTo)
+    WordSimilarSorted = dict(sorted(WordSimilarOutput.items(), key=lambda x: x[1], reverse=True))
+    return {word.text: round(similarity * 100) for word, similarity in WordSimilarSorted.items() if round(similarity * 100) >= Threshold} # Returns dictionary
+
+@contextlib.contextmanager
+def Setting(Settings): # Accepts a dictionary of the script settings and their values
+    'Changing settings of the script for a while'
+    Previous = {Name: getattr(Tool, Name) for Name in Settings}
+    for Name, Value in Settings.items():
+        setattr(Tool, Name, Value)
+    try:
+        yield
+    finally:
+        for Name, Value in Previous.items():
+            setattr(Tool, Name, Value)
+
+def Quietly(Function, *Arguments, **Options): # Accepts a function of the script and its arguments
+    'Calling a function of the script without its progress messages'
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Function(*Arguments, **Options) # Returns whatever the function returns
+
+def Checking(Checks, Name, Expected, Actual): # Accepts a list, a check name and two values to compare
+    'Recording whether the script gives exactly the reference result'
+    Passed = Expected == Actual
+    if Passed and isinstance(Expected, dict): # The order of the results matters as well
+        Passed = list(Expected.items()) == list(Actual.items())
+    Checks.append((Name, Passed))
+    print(f"{'PASS' if Passed else 'FAIL'}: {Name}")
+
+def CorpusChecking(Language, Filename, ModelPath): # Accepts one of the BenchLanguages keys, a corpus filename and a pipeline path
+    'Checking the results of the script against the reference implementations'
+    Checks = []
+    NLP = Tool.NLPLoading(ModelPath)
+    with open(Filename, 'r', encoding='utf-8', newline='') as filein:
+        RawText = filein.read()
+    for Profile in BenchLanguages[Language]['profiles']:
+        Name = f'{Language} {Profile}'
+        Expected = ReferencePreparation(RawText, Profile)
+        Checking(Checks, f'{Name}: text preparation', Expected, Quietly(lambda: ''.join(Tool.TextPreparation(Tool.TextReading(Filename), Profile))))
+        ParsedText = Quietly(lambda: Tool.ParsedTextCollecting(Tool.TextParsing(NLP, Tool.TextPreparation(Tool.TextReading(Filename), Profile), Processes=1)))
+        NLP.max_length = max(NLP.max_length, len(Expected) + 1) # The reference parses the whole text at once
+        Doc = NLP(Expected)
+        Checking(Checks, f'{Name}: lemmas', [token.lemma_ for token in Doc], Quietly(Tool.LemmaFiltering, ParsedText, set(), Keep=False))
+        Content = Quietly(Tool.LemmaFiltering, ParsedText, Tool.ContentWords, Keep=True)
+        Checking(Checks, f'{Name}: content word lemmas', [token.lemma_ for token in Doc if token.pos_ in Tool.ContentWords], Content)
+        Excluded = {'PRON', 'ADP', 'PUNCT', 'NUM'}
+        Checking(Checks, f'{Name}: lemmas without some parts of speech', [token.lemma_ for token in Doc if token.pos_ not in Excluded], Quietly(Tool.LemmaFiltering, ParsedText, Excluded, Keep=False))
+        for Threshold in (1, 5):
+            Reference = ReferenceFrequency(Content, Threshold)
+            Checking(Checks, f'{Name}: frequency above {Threshold}', Reference, Quietly(Tool.FrequencyFiltering, Content, Threshold))
+            Checking(Checks, f'{Name}: top 25 above {Threshold}', dict(list(Reference.items())[:25]), Quietly(Tool.FrequencyFiltering, Content, Threshold, TopK=25))
+        Vocabulary, LemmaIDs = Tool.LemmaInterning(Content)
+        with Setting(BenchSketchSettings): # The default settings are far too large for the corpora to go past the exact path
+            for ComboNumber, Combos in Quietly(lambda: list(Tool.NGramCalc(LemmaIDs, range(2, 5)))):
+                Reference = ReferenceFrequency(ReferenceCombos(Content, ComboNumber), 2)
+                Checking(Checks, f'{Name}: {ComboNumber}-word combinations in segments', Reference, Quietly(Tool.FrequencyFiltering, Combos, 2, KeyDecoder=lambda Combo: tuple(Vocabulary[i] for i in Combo)))
+            for ComboNumber, Combos in Quietly(lambda: list(Tool.NGramCalc(LemmaIDs, range(2, 4), PruneLimit=BenchNGramPruneLimit))):
+                Exact = Counter(ReferenceCombos(Content, ComboNumber))
+                Pruned = {tuple(Vocabulary[i] for i in Combo): freq for Combo, freq in Combos.items()}
+                Checking(Checks, f'{Name}: {ComboNumber}-word combinations pruned', True, len(Pruned) < len(Exact))
+                Checking(Checks, f'{Name}: pruned {ComboNumber}-word combinations never counted too high', True, all(freq <= Exact[Combo] for Combo, freq in Pruned.items()))
+                Checking(Checks, f'{Name}: pruned {ComboNumber}-word combinations keep the top 25', dict(Exact.most_common(25)), {Combo: Pruned.get(Combo) for Combo, freq in Exact.most_common(25)})
+            Exact = Counter(Content)
+            Approximate = Tool.CounterMaking(Content, 'heavyhitters')
+            Checking(Checks, f'{Name}: heavy hitters reduced', True, Approximate.Error > 0)
+            Checking(Checks, f'{Name}: heavy hitters within the error bound', True, all(Exact[word] - Approximate.Error <= freq <= Exact[word] for word, freq in Approximate.items()))
+            Checking(Checks, f'{Name}: heavy hitters error below Total / (Capacity + 1)', True, Approximate.Error <= Approximate.Total / (Approximate.Capacity + 1))
+            Checking(Checks, f'{Name}: heavy hitters keep every word more frequent than the error', True, all(word in Approximate for word, freq in Exact.items() if freq > Approximate.Error))
+            Approximate = Tool.CounterMaking(Content, 'countmin')
+            Estimates = dict(zip(Exact, Approximate.Estimating(list(Exact)).tolist()))
+            Checking(Checks, f'{Name}: count-min cells collide', True, any(Estimates[word] > freq for word, freq in Exact.items()))
+            Checking(Checks, f'{Name}: count-min estimates never too low', True, all(Estimates[word] >= freq for word, freq in Exact.items()))
+            Checking(Checks, f'{Name}: count-min within the error bound for 1 - e ** -Depth of the words', True, sum(Estimates[word] <= freq + Approximate.Error for word, freq in Exact.items()) >= (1 - math.exp(-Approximate.Table.shape[0])) * len(Exact))
+            Checking(Checks, f'{Name}: count-min kept counts between the true frequency and the estimate', True, all(Exact[word] <= freq <= Estimates[word] for word, freq in Approximate.items()))
+        SortedText = ReferenceFrequency(Content, 1)
+        Engine = Quietly(Tool.SimilarityEngine, NLP, SortedText)
+        Queries = list(SortedText)[:BenchQueries]
+        for Query, Result in zip(Queries, Quietly(Tool.SimilarityCalc, Engine, [NLP.make_doc(Query).vector for Query in Queries], Threshold=10)):
+            Checking(Checks, f'{Name}: words similar to {Query}', ReferenceSimilarity(NLP, SortedText, Query, 10), Result)
+        Reference = ReferenceFrequency(ReferenceCombos(Content, 2), 1)
+        with tempfile.TemporaryDirectory(prefix='QuickNLPFreqBench-') as Storing:
+            for Extension in ('tsv', 'csv', 'jsonl', 'qnf', 'tsv.gz'):
+                Quietly(Tool.ResultWriting, Reference, os.path.join(Storing, f'combos.{Extension}'))
+                Checking(Checks, f'{Name}: stored and loaded .{Extension}', Reference, dict(Tool.ResultLoading(os.path.join(Storing, f'combos.{Extension}')).items()))
+    return Checks # Returns a list of check names and results
+
+def BaselineComparing(Baseline, Results, Tolerance): # Accepts two BenchMain reports and a number in percent
+    'Flagging the stages that got slower or take more memory than in the baseline'
+    Regressions = []
+    if any(Baseline['corpora'].get(Corpus, Hash) != Hash for Corpus, Hash in Results['corpora'].items()):
+        print("Warning: the corpora differ from the ones of the baseline (another seed or NumPy version), the comparison may be meaningless.")
+    print(f"{'corpus':<12} {'stage':<14} {'baseline':>10} {'now':>10} {'change':>8}")
+    for Corpus, Stages in Results['results'].items():
+        for Stage, Record in Stages.items():
+            Base = Baseline['results'].get(Corpus, {}).get(Stage)
+            if Base is None:
+                continue # Not measured in the baseline
+            Change = (Record['wall'] - Base['wall']) / max(Base['wall'], 1e-9) * 100
+            Slower = Record['wall'] > Base['wall'] * (1 + Tolerance / 100) and Record['wall'] - Base['wall'] > BenchNoiseFloor
+            Larger = (Record['peak_rss_mb'] or 0) > (Base['peak_rss_mb'] or 0) * (1 + Tolerance / 100) + 5
+            Flag = ' SLOWER' if Slower else ''
+            Flag += f" MEMORY {Base['peak_rss_mb']} -> {Record['peak_rss_mb']} MB" if Larger else ''
+            print(f"{Corpus:<12} {Stage:<14} {Base['wall']:>9.3f}s {Record['wall']:>9.3f}s {Change:>+7.1f}%{Flag}")
+            if Flag:
+                Regressions.append((Corpus, Stage))
+    return Regressions # Returns a list of corpus and stage names
+
+def BenchArgumentsParsing(Arguments): # Accepts a list of command line arguments
+    'Reading the command line options'
+    Parser = argparse.ArgumentParser(description="Benchmarks and correctness checks for QuickNLPFreqTool on synthetic Russian and English corpora, no models have to be downloaded.")
+    Parser.add_argument('--languages', nargs='+', choices=list(BenchLanguages), default=list(BenchLanguages), help="Languages of the corpora (default: all)")
+    Parser.add_argument('--sizes', nargs='+', choices=list(BenchSizes), default=['1mb'], help="Sizes of the corpora (default: 1mb)")
+    Parser.add_argument('--stages', nargs='+', choices=BenchStages, default=BenchStages, help="Stages to measure (default: all), parsing always runs as every other stage needs it")
+    Parser.add_argument('--repeats', type=int, default=BenchRepeats, help=f"Number of runs of every stage, the fastest one is kept (default: {BenchRepeats})")
+    Parser.add_argument('--processes', type=int, default=1, help="Number of parsing processes (default: 1 for the results to be comparable between machines)")
+    Parser.add_argument('--seed', type=int, default=BenchSeed, help=f"Seed of the generated corpora and pipelines (default: {BenchSeed})")
+    Parser.add_argument('--check', action='store_true', help=f"Check the results against the reference implementations on the corpora up to {BenchCheckLimit >> 20} MB")
+    Parser.add_argument('--check-only', action='store_true', help="Only run the checks, measure nothing")
+    Parser.add_argument('--baseline', metavar='FILE', help="Compare the measurements with the ones stored earlier and flag the regressions")
+    Parser.add_argument('--save-baseline', metavar='FILE', help="Store the measurements to compare with later")
+    Parser.add_argument('--tolerance', type=float, default=BenchTolerance, help=f"Percent a stage may be slower or take more memory than in the baseline (default: {BenchTolerance})")
+    Parser.add_argument('--directory', default=BenchDirectory, help=f"Directory for the generated corpora and pipelines (default: {BenchDirectory})")
+    return Parser.parse_args(Arguments) # Returns argparse.Namespace
+
+def BenchMain(Arguments): # Accepts BenchArgumentsParsing output
+    'Generating the corpora, measuring the stages and checking the results'
+    os.makedirs(Arguments.directory, exist_ok=True)
+    Tool.CacheDirectory = None # Every run has to parse the text anew
+    Report = {
+        'version': Tool.ScriptVersion,
+        'python': platform.python_version(),
+        'spacy': spacy.__version__,
+        'numpy': numpy.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'seed': Arguments.seed,
+        'processes': Arguments.processes,
+        'corpora': {},
+        'results': {},
+    }
+    Checks = []
+    for Language in Arguments.languages:
+        ModelPath = PipelineMaking(Language, Arguments.seed, Arguments.directory)
+        for Size in Arguments.sizes:
+            print(f"Generating the {Size} {Language} corpus (only once for a seed)...")
+            Filename = CorpusGenerating(Language, Size, Arguments.seed, Arguments.directory)
+            Corpus = f'{Language}-{Size}'
+            Report['corpora'][Corpus] = Tool.FileHashing(Filename)
+            if (Arguments.check or Arguments.check_only) and BenchSizes[Size] <= BenchCheckLimit:
+                print(f"Checking the results on the {Corpus} corpus...")
+                Checks += CorpusChecking(Language, Filename, ModelPath)
+            if Arguments.check_only:
+                continue # Proceeds to the next corpus
+            print(f"Measuring the {Corpus} corpus...")
+            Report['results'][Corpus] = CorpusBenchmarking(Language, Filename, ModelPath, Arguments)
+            for Stage, Record in Report['results'][Corpus].items():
+                Throughput = ', '.join(f"{Record[Key]} {Key.replace('_', ' ')}" for Key in Record if Key.endswith('_per_second'))
+                print(f"{Corpus} {Stage}: {Record['wall']:.3f} s wall, {Record['cpu']:.3f} s CPU, {Record['peak_rss_mb']} MB peak RSS{', ' + Throughput if Throughput else ''}")
+    ExitCode = 0
+    if Checks:
+        Failed = [Name for Name, Passed in Checks if not Passed]
+        print(f"Checks: {len(Checks) - len(Failed)} passed, {len(Failed)} failed.")
+        ExitCode = 1 if Failed else 0
+    if Arguments.save_baseline and Report['results']:
+        with open(Arguments.save_baseline, 'w', encoding='utf-8') as fileout:
+            json.dump(Report, fileout, ensure_ascii=False, indent=1)
+        print(f"Baseline successfully stored in {Arguments.save_baseline}.")
+    if Arguments.baseline and Report['results']:
+        with open(Arguments.baseline, 'r', encoding='utf-8') as filein:
+            Regressions = BaselineComparing(json.load(filein), Report, Arguments.tolerance)
+        print(f"Regressions: {len(Regressions)} beyond {Arguments.tolerance}%.")
+        ExitCode = ExitCode or (2 if Regressions else 0)
+    return ExitCode # Returns the exit code: 1 if a check failed, 2 if a stage regressed
+
+# Actual program starts here
+if __name__ == '__main__':
+    sys.exit(BenchMain(BenchArgumentsParsing(sys.argv[1:])))
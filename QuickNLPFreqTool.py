@@ -4,6 +4,7 @@
 #   "scikit-learn",
 #   "regex",
 #   "spacy",
+#   "numpy",
 #   "matplotlib",
 # ]
 # ///
@@ -14,68 +15,217 @@
 # 2024
 
 from collections import Counter # Standard library utilized for frequency distribution
+from array import array # Standard library utilized to store lemma IDs compactly
 import sys # Standard library utilized to abort the script
+import os # Standard library utilized to count available CPU cores
+import time # Standard library utilized to measure the parsing speed
+import hashlib # Standard library utilized to recognize the files parsed earlier
+import tempfile # Standard library utilized to store the cached parses safely from several processes
+import argparse # Standard library utilized for the batch mode command line options
+import glob # Standard library utilized to find the files for the batch mode
+from concurrent.futures import ProcessPoolExecutor, as_completed # Standard library utilized to process many files at once
+from concurrent.futures.process import BrokenProcessPool # Standard library utilized to replace the daemon workers that have crashed
+import multiprocessing # Standard library utilized to start the daemon workers without forking its threads
+import json # Standard library utilized to talk to the daemon
+import threading # Standard library utilized to bound the number of daemon jobs
+import signal # Standard library utilized to stop the daemon cleanly
+import socket, socketserver, http.client # Standard library utilized to talk to the daemon over a Unix socket (or a local port on Windows)
+import secrets, hmac, stat # Standard library utilized to keep the daemon to its own user
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer # Standard library utilized to run the daemon
+from itertools import chain, islice # Standard library utilized to peek into the stream of text chunks
+from collections.abc import Mapping # Standard library utilized to tell counts from items to be counted
+from operator import itemgetter # Standard library utilized to sort by frequency
+import heapq # Standard library utilized to pick the most frequent words without sorting all of them
+import math # Standard library utilized for the count-min error bound
+import io, csv, gzip # Standard library utilized to store the results
+import mmap, struct # Standard library utilized to look up the results in binary tables
+import contextlib, atexit, platform # Standard library utilized to measure the stages of the script
+import cProfile, tracemalloc # Standard library utilized to look into a single stage of the script
+try:
+    import resource # Standard library utilized to measure the peak memory (not available on Windows)
+except ImportError:
+    resource = None
 import regex # Regular expressions (to replace it with 're' see TextPreparation.FilterUserChoice == 'en' section)
-import spacy # NLP (download instructions are printed out)
-import matplotlib.pyplot as PLT # Visual plotting (see comments in the PlottingTheGraph function)
-from sklearn.decomposition import PCA # Vector dimensions reduction (see comments in the PlottingTheGraph function)
+import numpy # Word vectors math (installed along with spaCy)
+# SpaCy (NLP, download instructions are printed out) takes most of the start-up time so it's imported by the functions that need it
+# Runs handed over to the daemon never import it (see the BatchMain function)
+
+ScriptVersion = '1.0.2' # Shown in the welcome message and reported by the daemon
+
+# Parsing settings (see comments in the TextChunking and TextParsing functions)
+ParsingChunkSize = 100000 # Maximum number of characters sent to spaCy at once, must stay below NLP.max_length (1000000 by default)
+ParsingBatchSize = 16 # Number of chunks spaCy processes per batch
+ParsingProcesses = max(1, (os.cpu_count() or 1) // 2) # Every process holds its own copy of the model so mind the RAM with 'lg' models
+LoadedModels = {} # Models loaded so far by the NLPLoading function
+ExcludedComponents = ['parser', 'ner', 'senter', 'entity_ruler', 'entity_linker', 'textcat', 'textcat_multilabel', 'spancat'] # Components the script never uses, names missing from the model are ignored
+NGramSegmentSize = 1000000 # Number of word combinations counted between pruning checks in the 'combos' mode
+NGramPruneLimit = None # Maximum number of distinct word combinations kept in memory, None for no pruning (see comments in the NGramPruning function)
+FrequencyTopK = None # Maximum number of the most frequent words kept, None for all of them
+SimilarityTopK = None # Maximum number of similar words shown per query in the 'vectors' mode, None for all of them
+ReadingBlockSize = 1048576 # Number of characters read from the file at once (see comments in the TextNormalization function)
+
+# Counting settings (see comments in the HeavyHittersCounter and CountMinCounter classes)
+CountingBackend = 'exact' # 'exact', 'heavyhitters' or 'countmin', the last two count with a fixed amount of memory but approximately
+CountingCapacity = 100000 # Number of the most frequent items the approximate backends keep
+CountingBlockSize = 100000 # Number of items counted at once by the approximate backends
+CountMinWidth = 1048576 # Cells in every row of the count-min table, the error is about 2.7 per million counted items per million cells
+CountMinDepth = 4 # Rows of the count-min table, every row lowers the chance of an estimate being off by more than the error
+
+# Result storing settings (see comments in the ResultWriting and TableWriting functions)
+WritingBufferSize = 1048576 # Number of bytes buffered before writing to the file
+WritingBlockSize = 10000 # Number of entries formatted at once
+TableMagic = b'QNFT' # First bytes of a binary table
+TableVersion = 1 # Increase whenever the binary table layout changes
+TableHeader = struct.Struct('<4sIQQ') # Magic, version, words per combination (0 for individual words), number of entries
+
+# Plotting settings (see comments in the PlottingTheGraph function)
+PlottingSolver = 'auto' # PCA solver, 'randomized' is much faster on thousands of words and 'full' is exact
+PlottingIncrementalLimit = 50000 # Number of words above which the PCA is fitted batch by batch
+PlottingBatchSize = 10000 # Number of words in a batch for the incremental PCA
+PlottingLabelGrid = 30 # Only the first word in every cell of a grid this many cells wide gets a label, None labels every word
+PlottingDefaultFilename = 'QuickNLPFreqTool.png' # Graph file for when there's no display to show the graph on
+
+# Tracing settings (see comments in the Stage function)
+TracingSettings = {} # Filled in by the TracingStarting function when the script is run with --trace, tracing is off while it's empty
+TracingRecords = [] # Measurements of the stages done so far in this process
+TracingStages = ['cache', 'loading', 'preparation', 'parsing', 'filtering', 'counting', 'selection', 'combos', 'vectors', 'similarity', 'plotting', 'storing']
+ProgressInterval = 5 # Seconds between the progress reports of a long parse when tracing
+
+# Daemon settings (see comments in the DaemonMain function)
+DaemonUnix = hasattr(socket, 'AF_UNIX') # The daemon listens on a Unix socket where there are any, on a local port with a token otherwise (Windows)
+DaemonDirectory = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir(), f'QuickNLPFreqTool-{os.getuid()}' if hasattr(os, 'getuid') else 'QuickNLPFreqTool') # Only its user may enter it (see the DaemonDirectoryMaking function)
+DaemonSocket = os.path.join(DaemonDirectory, 'daemon.sock') # Unix socket the daemon listens on and the batch runs look for it at
+DaemonPort = 8765 # Local port the daemon listens on where there are no Unix sockets
+DaemonTokenFile = os.path.join(DaemonDirectory, 'daemon.token') # Random token the clients have to send when the daemon listens on a port
+DaemonConcurrency = 2 # Maximum number of jobs the daemon runs at once, the rest are turned down and processed by the clients
+
+# Parse cache settings (see comments in the CacheKey and CacheStoring functions)
+CacheDirectory = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'QuickNLPFreqTool') # None to turn the cache off
+CacheSizeLimit = 2147483648 # Maximum size of the cache in bytes, least recently used entries are removed first
+
+# Text preparation profiles (see comments in the NormalizerCompiling and TextNormalization functions)
+NormalizationVersion = 1 # Increase whenever the text preparation code changes so that the cached parses are made anew (changed patterns are noticed anyway)
+Hyphens = '\u002D\u2012\u2013\u2014\u2015' # Some annoying hyphen variations, a regular one goes first
+NormalizationProfiles = {
+    'ru': r'а-яА-ЯёЁ0-9.,!?:\s\n\r\u002D\u2012\u2013\u2014\u2015\u0306\u0308', # Leaves only basic punctuation and Cyrillic characters
+    'en-basic': r'a-zA-Z0-9.,!?:\s\n\r\u002D\u2012\u2013\u2014\u2015', # Leaves only basic punctuation and basic Latin characters
+    'en-extended': r'\p{Latin}0-9.,!?:\s\n\r\u002D\u2012\u2013\u2014\u2015', # Leaves only basic punctuation and Latin characters
+    'skip': None, # Leaves everything
+}
+HyphenRuns = regex.compile(r'[\u002D\u2012\u2013\u2014\u2015]+')
+SpaceRuns = regex.compile(r'\s{2,}|[\r\n]') # Replacing end-of-lines and multiple spaces at once gives the same result as doing it one after another
+
+def NormalizerCompiling(Profile): # Accepts one of the NormalizationProfiles keys
+    'Compiling the regular expressions of a text preparation profile'
+    # Filter leaves only the allowed characters (None for the 'skip' profile)
+    # Boundary finds the last character that no replacement can span across, searching from the end of the text
+    # Spaces, hyphens and е/ё (which may carry a diaeresis) are such characters as well as the removed ones
+    Characters = NormalizationProfiles[Profile]
+    Special = r'\s' + regex.escape(Hyphens) + ('еЕёЁ' if Profile == 'ru' else '')
+    if Characters is None:
+        return None, regex.compile(rf'(?r)[^{Special}]')
+    return regex.compile(f'[^{Characters}]+'), regex.compile(rf'(?r)(?![{Special}])[{Characters}]')
 
-def TextPreparation(TextInput):
-    'Preparing the raw text (important for Russian source data)'
+def BlockNormalization(TextInput, Filter, Profile): # Accepts a string, a compiled expression or None and a profile name
+    'Running the text preparation steps on a single block'
+    if Filter is not None:
+        TextInput = Filter.sub('', TextInput) # Leaves only the characters allowed by the profile
+    TextInput = HyphenRuns.sub('-', TextInput) # Replaces some annoying hyphen variations with a regular one
+    TextInput = SpaceRuns.sub(' ', TextInput) # Replaces end-of-lines and multiple spaces with a single space
+    if Profile == 'ru':
+        TextInput = TextInput.replace('ё', 'е') # ё
+        TextInput = TextInput.replace('Ё', 'Е') # Ё
+        TextInput = TextInput.replace('\u0435\u0308', 'е') # е with diaeresis
+        TextInput = TextInput.replace('\u0415\u0308', 'Е') # Е with diaeresis
+    return TextInput # Returns string
+
+def TextNormalization(TextInput, Profile): # Accepts an iterable of strings, e.g. the blocks from TextReading
+    'Normalizing the raw text block by block'
+    # Output is the same as if the whole text was processed at once but the file is never held in memory in full
+    # Every block is cut after the last character no replacement can span across and the rest is carried over to the next one
+    # Regular expressions are compiled once per run and every block stays small enough to be scanned in the CPU cache
+    Filter, Boundary = NormalizerCompiling(Profile)
+    Carry = ''
+    for Block in TextInput:
+        Text = Carry + Block
+        Match = Boundary.search(Text)
+        if Match is None: # Only removed characters, spaces, hyphens (and е/ё) so far, e.g. Latin text with the 'ru' profile
+            # Normalizing them early gives the same result, and afterwards no replacement can span across any two of them but the last one and whatever comes next
+            # Otherwise the carry would grow with the file and be searched through anew for every block
+            Text = BlockNormalization(Text, Filter, Profile)
+            if len(Text) > 1:
+                yield Text[:-1]
+            Carry = Text[-1:]
+            continue # Proceeds to the next block
+        Carry = Text[Match.end():]
+        yield BlockNormalization(Text[:Match.end()], Filter, Profile) # Returns normalized strings one by one
+    if Carry:
+        yield BlockNormalization(Carry, Filter, Profile)
+
+def ProfileSelection():
+    'Choosing how to prepare the raw text (important for Russian source data)'
     print("Select one of the options below regarding text processing...")
     print("ru: Leave only Cyrillic characters")
     print("en: Leave only Latin characters")
     print("skip: Do nothing and skip processing the text")
     print("Be aware: some Unicode symbols can mess up the output unless dealt with early on.")
-    while True: # Running regular expressions to filter stuff
+    while True: # Choosing the regular expressions to filter stuff
         FilterUserChoice = input("Your selection: ru/en/skip: ").strip().lower()
         if FilterUserChoice == 'ru': # Sample text of size 550000 is reduced to 500000
-            print("Processing file content...")
-            OnlyCyrillicText = regex.sub(r'[^а-яА-ЯёЁ0-9.,!?:\s\n\r\u002D\u2012\u2013\u2014\u2015\u0306\u0308]+', '', TextInput) # Leaves only basic punctuation and Cyrillic characters
-            TextWithoutNewlines = regex.sub(r'[\r\n]+', ' ', OnlyCyrillicText) # Replaces end-of-lines with spaces
-            TextWithoutHyphens = regex.sub(r'[\u002D\u2012\u2013\u2014\u2015]+', '-', TextWithoutNewlines) # Replaces some annoying hyphen variations with a regular one
-            TextWithoutMultipleSpaces = regex.sub(r'\s{2,}', ' ', TextWithoutHyphens) # Replaces multiple spaces with a single space
-            print("Replacing ё with e for congruity...")
-            TextWithoutYo = TextWithoutMultipleSpaces.replace('ё', 'е') # ё
-            TextWithoutYo = TextWithoutYo.replace('Ё', 'Е') # Ё
-            TextWithoutYo = TextWithoutYo.replace('\u0435\u0308', 'е') # е with diaeresis
-            TextOutput = TextWithoutYo.replace('\u0415\u0308', 'Е') # Е with diaeresis
+            Profile = 'ru'
             break # Exit the loop
         elif FilterUserChoice == 'en':
-            print("Using the extended Latin characters set. Processing file content...")
-            # OnlyLatinText is the only place where regex module is utilized (\p{Latin} character set)
+            # The 'en-extended' profile is the only place where regex module is utilized (\p{Latin} character set)
             # Edit the loop below to leave only 'y' LatinUserChoice selection and replace 'import regex' with 'import re' in the header if you don't need this
+            # Be aware that re doesn't support the reverse search (?r) used in NormalizerCompiling so the boundary expressions would need to be rewritten as well
             while True: # Leaving only basic Latin
                 LatinUserChoice = input("Do you want to leave only basic latin (be aware: some words may have their individual letters removed)? (y/n): ").strip().lower()
                 if LatinUserChoice == 'y':
-                    OnlyLatinText = regex.sub(r'[^a-zA-Z0-9.,!?:\s\n\r\u002D\u2012\u2013\u2014\u2015]+', '', TextInput) # Leaves only basic punctuation and basic Latin characters
-                    # Alternative: text.encode("ASCII", "replace").decode()
+                    Profile = 'en-basic' # Alternative: text.encode("ASCII", "replace").decode()
                     break # Exits the loop
                 elif LatinUserChoice == 'n':
-                    OnlyLatinText = regex.sub(r'[^\p{Latin}0-9.,!?:\s\n\r\u002D\u2012\u2013\u2014\u2015]+', '', TextInput) # Leaves only basic punctuation and Latin characters
+                    print("Using the extended Latin characters set...")
+                    Profile = 'en-extended'
                     break # Exits the loop
                 else:
                     print("Invalid choice. Please enter 'y' or 'n'.") # Restarts the loop
-            TextWithoutNewlines = regex.sub(r'[\r\n]+', ' ', OnlyLatinText) # Replaces end-of-lines with spaces
-            TextWithoutHyphens = regex.sub(r'[\u002D\u2012\u2013\u2014\u2015]+', '-', TextWithoutNewlines) # Replaces some annoying hyphen variations with a regular one
-            TextOutput = regex.sub(r'\s{2,}', ' ', TextWithoutHyphens) # Replaces multiple spaces with a single space
             break # Exit the loop
         elif FilterUserChoice == 'skip':
             print("Skipping filtering the text...")
-            TextWithoutNewlines = regex.sub(r'[\r\n]+', ' ', TextInput) # Replaces end-of-lines with spaces
-            TextWithoutHyphens = regex.sub(r'[\u002D\u2012\u2013\u2014\u2015]+', '-', TextWithoutNewlines) # Replaces some annoying hyphen variations with a regular one
-            TextOutput = regex.sub(r'\s{2,}', ' ', TextWithoutHyphens) # Replaces multiple spaces with a single space
+            Profile = 'skip'
             break # Exits the loop
         else:
             print("Invalid choice. Please enter 'ru' or 'en' or 'skip'.") # Restarts the loop
     print() # Print a blank line for readability
-    return TextOutput # Returns string
+    return Profile # Returns one of the NormalizationProfiles keys
+
+def TextPreparation(TextInput, Profile): # Accepts an iterable of strings and one of the NormalizationProfiles keys
+    'Preparing the raw text'
+    print("Processing file content...")
+    if Profile == 'ru':
+        print("Replacing ё with e for congruity...")
+    return TextNormalization(TextInput, Profile) # Returns a generator of strings
+
+def ModelSizeSelection(Mode): # Accepts the processing mode: words/combos/vectors
+    'Choosing the size of the default language model'
+    if Mode == 'vectors':
+        return 'lg' # Default 'lg' size option is needed for use with word vectors later in the script
+    print("Word vectors are not needed to count the frequency so a smaller model can be used...")
+    print("lg: Large model (needed for the word vectors graph)")
+    print("md: Medium model (reduced word vectors)")
+    print("sm: Small model (fastest to load, no word vectors)")
+    while True:
+        SizeUserChoice = input("Your selection: lg/md/sm: ").strip().lower()
+        if SizeUserChoice in ('lg', 'md', 'sm'):
+            return SizeUserChoice
+        print("Invalid choice. Please enter either 'lg' or 'md' or 'sm'.") # Restarts the loop
 
-def NLPSelection():
+def NLPSelection(Mode): # Accepts the processing mode: words/combos/vectors
     'Choosing NLP model to use throughout the script'
+    # The model is only loaded later on (see the NLPLoading function) so that a cached parse doesn't have to wait for it
     print("Please select which language model to use...")
-    print("ru: SpaCy ru_core_news_lg (Russian)")
-    print("en: SpaCy en_core_web_lg (English)")
+    print("ru: SpaCy ru_core_news (Russian)")
+    print("en: SpaCy en_core_web (English)")
     print("other: Enter SpaCy model name explicitly. Be aware that the script was tested only on Russian and English texts")
     print("abort: Stop the script")
     print("You may have to install the models separately using your preferred method.")
@@ -84,15 +234,14 @@ def NLPSelection():
         NLPModelUserChoice = input("Your selection: ru/en/other/abort: ").strip().lower()
         if NLPModelUserChoice == 'ru':
             print("Russian model selected...")
-            NLP = spacy.load("ru_core_news_lg") # Default 'lg' size option is included for use with word vectors later in the script
+            ModelName = f"ru_core_news_{ModelSizeSelection(Mode)}"
             break # Exits the loop
         elif NLPModelUserChoice == 'en':
             print("English model selected...")
-            NLP = spacy.load("en_core_web_lg") # Default 'lg' size option is included for use with word vectors later in the script
+            ModelName = f"en_core_web_{ModelSizeSelection(Mode)}"
             break # Exits the loop
         elif NLPModelUserChoice == 'other':
-            CustomNLP = input("Please enter spaCy model name in a raw text format (no checks will be made): ").strip()
-            NLP = spacy.load(CustomNLP)
+            ModelName = input("Please enter spaCy model name in a raw text format (no checks will be made): ").strip()
             break # Exits the loop
         elif NLPModelUserChoice == 'abort':
             print("Aborting the script...")
@@ -100,9 +249,210 @@ def NLPSelection():
         else:
             print("Invalid choice. Please enter either 'ru' or 'en' or 'other' or 'abort'.") # Restarts the loop
     print() # Print a blank line for readability
+    return ModelName # Returns string
+
+def NLPLoading(ModelName): # Accepts a spaCy model name or path
+    'Loading the NLP model'
+    # Lemmatization only reads lemmas and parts of speech so every other trained component is excluded from loading altogether
+    # Word vectors belong to the model vocabulary rather than to a component and are always loaded
+    # They can't be left out for 'lg' models anyway since their tok2vec component is trained with them
+    # Every model is loaded once per process and reused afterwards
+    if ModelName in LoadedModels:
+        return LoadedModels[ModelName]
+    import spacy # NLP
+    print(f"Loading {ModelName}...")
+    with Stage('loading', model=ModelName):
+        NLP = spacy.load(ModelName, exclude=ExcludedComponents)
+    print(f"Loaded components: {', '.join(NLP.pipe_names)}")
+    print() # Print a blank line for readability
+    LoadedModels[ModelName] = NLP
     return NLP
 
-def Lemmatization(TextInput): # Accepts a spaCy doc object
+def TextReading(FilenameInput, BlockSize=ReadingBlockSize): # Accepts a filename
+    'Reading the text file block by block'
+    # Reading and decoding errors are raised to the caller, the dialogues report them and exit (see InteractiveMain) and the batch mode reports them per file
+    with open(FilenameInput, 'r', encoding='utf-8') as file: # Opening the file
+        for Block in iter(lambda: file.read(BlockSize), ''):
+            yield Block # Returns string blocks one by one
+
+def TextChunking(TextInput, ChunkSize=ParsingChunkSize): # Accepts an iterable of strings
+    'Splitting the prepared text into sentence-bounded chunks'
+    # Chunks are cut right after the last sentence end that fits into ChunkSize
+    # If there's none (e.g. the 'skip' option on a text without punctuation) the last space is used instead
+    # The trailing space stays with the chunk so that spaCy tokenizes the boundary the same way as in the whole text
+    Buffer = ''
+    for Block in TextInput:
+        Buffer += Block
+        while len(Buffer) > ChunkSize:
+            End = ChunkSize
+            Boundary = max(Buffer.rfind(Mark, 0, End) for Mark in ('. ', '! ', '? ')) # Looking for the last sentence end
+            if Boundary > 0:
+                End = Boundary + 2 # Cuts after the punctuation mark and the space
+            else:
+                Boundary = Buffer.rfind(' ', 0, End) # Looking for the last word end
+                if Boundary > 0:
+                    End = Boundary + 1 # Cuts after the space
+            yield Buffer[:End] # Returns string chunks one by one
+            Buffer = Buffer[End:]
+    if Buffer:
+        yield Buffer # The last chunk
+
+def TextParsing(NLP, TextInput, Processes=None): # Accepts a spaCy language object, an iterable of strings and an optional number
+    'Parsing the prepared text chunk by chunk'
+    # Replaces a single NLP(TextInput) call which uses only one core, holds the whole doc in memory and fails on texts above NLP.max_length
+    # Docs are produced lazily so only ParsingBatchSize chunks per process are held in memory at any given time
+    print("Parsing the text...")
+    Chunks = TextChunking(TextInput)
+    FirstChunks = list(islice(Chunks, 2))
+    if Processes is None:
+        Processes = ParsingProcesses
+    if len(FirstChunks) < 2:
+        Processes = 1 # Starting extra processes isn't worth it for a single chunk
+    print() # Print a blank line for readability
+    return ParsingReport(NLP.pipe(chain(FirstChunks, Chunks), batch_size=ParsingBatchSize, n_process=Processes)) # Returns a generator of spaCy doc objects
+
+def ParsingReport(TextInput): # Accepts an iterable of spaCy doc objects
+    'Reporting the parsing speed once all the docs are processed'
+    Start = Progress = time.perf_counter()
+    Tokens = 0
+    for doc in TextInput:
+        Tokens += len(doc)
+        if TracingSettings and time.perf_counter() - Progress > ProgressInterval: # Long parses report their progress when tracing
+            Progress = time.perf_counter()
+            print(f"[trace] Parsed {Tokens} tokens so far ({Tokens / (Progress - Start):.0f} tokens per second)...")
+        yield doc # Passes the docs through one by one
+    Elapsed = time.perf_counter() - Start
+    print(f"Parsed {Tokens} tokens in {Elapsed:.1f} seconds ({Elapsed * 1000000 / max(Tokens, 1):.1f} seconds per million tokens).")
+
+def ParsedTextCollecting(TextInput): # Accepts an iterable of spaCy doc objects
+    'Keeping only the lemmas and parts of speech of the parsed text'
+    # Every distinct lemma is stored once, the text itself becomes two compact arrays of lemma IDs and part of speech IDs
+    # That's all the Lemmatization function needs and it's small enough to be cached on disk (see the CacheStoring function)
+    from spacy.attrs import LEMMA, POS # Token attributes (lemma, part of speech)
+    IDs = {}
+    LemmaIDs, POSIDs = [], []
+    Strings = None
+    for doc in TextInput:
+        Strings = doc.vocab.strings
+        Attributes = doc.to_array([LEMMA, POS])
+        Hashes, Positions = numpy.unique(Attributes[:, 0], return_inverse=True) # Distinct lemmas of the doc
+        DocIDs = numpy.array([IDs.setdefault(Hash, len(IDs)) for Hash in Hashes.tolist()], dtype=numpy.uint32) # New lemmas get the next free ID
+        LemmaIDs.append(DocIDs[Positions.reshape(-1)])
+        POSIDs.append(Attributes[:, 1].astype(numpy.uint8)) # Universal part of speech IDs are below 256
+    Lemmas = [Strings[Hash] for Hash in IDs] if Strings is not None else []
+    LemmaIDs = numpy.concatenate(LemmaIDs) if LemmaIDs else numpy.zeros(0, dtype=numpy.uint32)
+    POSIDs = numpy.concatenate(POSIDs) if POSIDs else numpy.zeros(0, dtype=numpy.uint8)
+    return Lemmas, LemmaIDs, POSIDs # Returns a list (ID to lemma) and two arrays
+
+def FileHashing(FilenameInput): # Accepts a filename
+    'Calculating the hash of the file content'
+    Hash = hashlib.sha256()
+    with open(FilenameInput, 'rb') as file:
+        for Block in iter(lambda: file.read(ReadingBlockSize), b''):
+            Hash.update(Block)
+    return Hash.hexdigest() # Returns string
+
+def CacheKey(FilenameInput, Profile, ModelName): # Accepts a filename, one of the NormalizationProfiles keys and a spaCy model name or path
+    'Naming the cached parse of a file'
+    # Everything the parse depends on is a part of the key so a changed file, model, spaCy or text preparation never gets a stale result
+    # Stale entries are simply never read again and get evicted eventually (see the CacheEviction function)
+    import spacy # NLP
+    try:
+        ModelVersion = spacy.util.get_package_version(ModelName) or spacy.util.get_model_meta(ModelName).get('version')
+    except Exception: # Not installed or not a path, loading will complain later on
+        ModelVersion = None
+    Normalization = [NormalizationVersion, NormalizationProfiles[Profile], HyphenRuns.pattern, SpaceRuns.pattern] # Edited patterns give another key by themselves
+    Parts = [FileHashing(FilenameInput), Profile, Normalization, ModelName, ModelVersion, spacy.__version__, ParsingChunkSize, ExcludedComponents]
+    return hashlib.sha256(repr(Parts).encode('utf-8')).hexdigest() # Returns string
+
+def CacheLoading(Key): # Accepts a CacheKey
+    'Loading the cached parse if there is one'
+    if CacheDirectory is None:
+        return None
+    CachePath = os.path.join(CacheDirectory, f'{Key}.npz')
+    try:
+        with numpy.load(CachePath) as Cache:
+            if str(Cache['Key']) != Key:
+                raise ValueError("Cache key mismatch")
+            Offsets = Cache['LemmaOffsets'].tolist()
+            Blob = Cache['LemmaBlob'].tobytes()
+            Lemmas = [Blob[Start:End].decode('utf-8') for Start, End in zip(Offsets, Offsets[1:])]
+            ParsedText = Lemmas, Cache['LemmaIDs'], Cache['POSIDs']
+    except FileNotFoundError:
+        return None
+    except Exception as e: # Broken files are removed and parsed again
+        print(f"Ignoring the broken cached parse: {e}")
+        with contextlib.suppress(OSError): # Another process may have removed it already
+            os.remove(CachePath)
+        return None
+    with contextlib.suppress(OSError): # Another process may have evicted it in the meantime
+        os.utime(CachePath) # Marks the entry as recently used
+    print("Found the parsed text from an earlier run, skipping parsing...")
+    print() # Print a blank line for readability
+    return ParsedText # Returns a list and two arrays
+
+def CacheStoring(Key, ParsedText): # Accepts a CacheKey and ParsedTextCollecting output
+    'Storing the parsed text for the later runs'
+    if CacheDirectory is None:
+        return
+    Lemmas, LemmaIDs, POSIDs = ParsedText
+    Encoded = [lemma.encode('utf-8') for lemma in Lemmas]
+    Offsets = numpy.cumsum([0] + [len(lemma) for lemma in Encoded], dtype=numpy.int64)
+    TemporaryPath = None
+    try:
+        os.makedirs(CacheDirectory, exist_ok=True)
+        CachePath = os.path.join(CacheDirectory, f'{Key}.npz')
+        # Written aside and renamed so that an interrupted run doesn't leave a broken file
+        # Every writer gets its own temporary file since batch workers parsing identical files store the same key at once
+        Handle, TemporaryPath = tempfile.mkstemp(dir=CacheDirectory, prefix=f'{Key}.', suffix='.tmp')
+        with os.fdopen(Handle, 'wb') as fileout:
+            numpy.savez(fileout, Key=numpy.array(Key), LemmaBlob=numpy.frombuffer(b''.join(Encoded), dtype=numpy.uint8), LemmaOffsets=Offsets, LemmaIDs=LemmaIDs, POSIDs=POSIDs)
+        os.replace(TemporaryPath, CachePath) # The last writer wins, both wrote the same parse
+        TemporaryPath = None
+        CacheEviction(CachePath)
+    except OSError as e: # The cache is optional so the script goes on
+        print(f"An error occurred while caching the parsed text: {e}")
+    finally:
+        if TemporaryPath is not None:
+            with contextlib.suppress(OSError):
+                os.remove(TemporaryPath)
+
+def CacheEviction(KeepPath): # Accepts the path of the entry that has just been stored
+    'Removing the least recently used entries once the cache gets too big'
+    # Another process may be evicting the same entries, so any of them may be gone by the time it's looked at or removed
+    Entries = []
+    for Name in os.listdir(CacheDirectory):
+        if Name.endswith('.npz'):
+            with contextlib.suppress(OSError):
+                Status = os.stat(os.path.join(CacheDirectory, Name))
+                Entries.append((Status.st_mtime, Status.st_size, os.path.join(CacheDirectory, Name)))
+    Entries.sort() # Oldest first
+    Total = sum(Size for Time, Size, Entry in Entries)
+    for Time, Size, Entry in Entries:
+        if Total <= CacheSizeLimit or Entry == KeepPath:
+            break # Exits the loop
+        Total -= Size # Gone either way
+        with contextlib.suppress(OSError):
+            os.remove(Entry)
+
+def ParsedTextLoading(FilenameInput, Profile, ModelName, Processes=None): # Accepts a filename, one of the NormalizationProfiles keys, a spaCy model name or path and an optional number
+    'Preparing and parsing the text or loading the parse of an earlier run'
+    # The model is loaded only if the parse isn't cached
+    with Stage('cache', file=FilenameInput) as Record:
+        Key = CacheKey(FilenameInput, Profile, ModelName)
+        ParsedText = CacheLoading(Key)
+        Record['hit'] = ParsedText is not None
+    if ParsedText is None:
+        NLP = NLPLoading(ModelName)
+        with Stage('parsing', file=FilenameInput) as Record:
+            FilteredText = StageStreaming({'stage': 'preparation', 'file': FilenameInput, 'profile': Profile}, TextPreparation(TextReading(FilenameInput), Profile))
+            ParsedText = ParsedTextCollecting(TextParsing(NLP, FilteredText, Processes))
+            Record['tokens'] = len(ParsedText[1])
+        with Stage('storing', file=FilenameInput, target='cache'):
+            CacheStoring(Key, ParsedText)
+    return ParsedText # Returns ParsedTextCollecting output
+
+def Lemmatization(TextInput): # Accepts ParsedTextCollecting output
     'Lemmatizes and optionally filters service parts of speech from the text'
     print("Select one of the following options regarding filtering the text...")
     print("y: Leave only nouns, adjectives, verbs, and adverbs")
@@ -115,11 +465,10 @@ def Lemmatization(TextInput): # Accepts a spaCy doc object
     while True:
         FilterUserChoice = input("Your selection: y/n/choose: ").strip().lower()
         if FilterUserChoice == 'y':
-            Included = {"NOUN", "ADJ", "VERB", "ADV"} # Nouns, adjectives, verbs, and adverbs
-            TextOutput = [token.lemma_ for token in TextInput if token.pos_ in Included]
+            TextOutput = LemmaFiltering(TextInput, ContentWords, Keep=True)
             break # Exits the loop
         elif FilterUserChoice == 'n':
-            TextOutput = [token.lemma_ for token in TextInput] # Doesn't filter anything
+            TextOutput = LemmaFiltering(TextInput, set(), Keep=False) # Doesn't filter anything
             break # Exits the loop
         elif FilterUserChoice == 'choose':
             print("Now begins a series of queries regarding different parts of speech")
@@ -142,15 +491,161 @@ def Lemmatization(TextInput): # Accepts a spaCy doc object
                 Excluded.add("SYM") # Symbols
                 Excluded.add("PUNCT") # Punctuation
                 Excluded.add("NUM") # Numbers
-            TextOutput = [token.lemma_ for token in TextInput if token.pos_ not in Excluded] # Filters selected
+            TextOutput = LemmaFiltering(TextInput, Excluded, Keep=False) # Filters selected
             break # Exits the loop
         else:
             print("Invalid choice. Please enter either 'y' or 'n' or 'choose'.") # Restarts the loop
     print() # Print a blank line for readability
     return TextOutput # Returns list
 
-def FrequencyCalc(TextInput): # Accepts a list
+ContentWords = {"NOUN", "ADJ", "VERB", "ADV"} # Nouns, adjectives, verbs, and adverbs
+
+def LemmaFiltering(TextInput, PartsOfSpeech, Keep): # Accepts ParsedTextCollecting output, a set of part of speech tags, and a boolean
+    'Leaving only the lemmas with (Keep=True) or without (Keep=False) the selected parts of speech'
+    from spacy.parts_of_speech import IDS as POSTags # Universal part of speech tags to their IDs
+    Lemmas, LemmaIDs, POSIDs = TextInput
+    with Stage('filtering', tokens=len(LemmaIDs)):
+        Selected = numpy.isin(POSIDs, [POSTags[tag] for tag in PartsOfSpeech], invert=not Keep)
+        TextOutput = numpy.array(Lemmas, dtype=object)[LemmaIDs[Selected]].tolist()
+    return TextOutput # Returns list
+
+class HeavyHittersCounter(Counter):
+    'Counting with a fixed number of counters (Misra-Gries summary)'
+    # Keeps at most 2 * Capacity counters, once there are more all the counts are lowered by the (Capacity + 1)-th largest one and the ones reaching zero are dropped
+    # Every count is lower than the true frequency by at most Error, which never exceeds Total / (Capacity + 1)
+    # So no word more frequent than that can be lost
+    # Summaries are merged with update() the same way Counters are added up, Error is added up as well
+    def __init__(self, Capacity=None, Error=0):
+        self.Capacity = Capacity or CountingCapacity
+        self.Error = Error
+        self.Total = 0
+        super().__init__()
+
+    def update(self, TextInput=None, **kwargs):
+        if TextInput is None:
+            return # Nothing to count
+        if isinstance(TextInput, HeavyHittersCounter):
+            self.Error += TextInput.Error
+        if isinstance(TextInput, Mapping):
+            self.Total += TextInput.Total if isinstance(TextInput, HeavyHittersCounter) else sum(TextInput.values())
+            super().update(TextInput)
+            self.Reducing()
+            return # Exits the function
+        TextInput = iter(TextInput)
+        while Block := list(islice(TextInput, CountingBlockSize)): # Counts a block at a time to keep the memory bounded
+            self.Total += len(Block)
+            super().update(Block)
+            self.Reducing()
+
+    def Reducing(self):
+        'Lowering the counts until only the most frequent items are left'
+        if len(self) <= 2 * self.Capacity:
+            return # Exits the function
+        Counts = numpy.fromiter(self.values(), dtype=numpy.int64, count=len(self))
+        Cut = int(numpy.partition(Counts, len(Counts) - self.Capacity - 1)[len(Counts) - self.Capacity - 1]) # (Capacity + 1)-th largest count
+        for word in [word for word, freq in self.items() if freq <= Cut]:
+            del self[word]
+        for word in self:
+            self[word] -= Cut
+        self.Error += Cut
+
+    def copy(self):
+        TextOutput = self.__class__(self.Capacity, self.Error)
+        TextOutput.Total = self.Total
+        dict.update(TextOutput, self)
+        return TextOutput # Returns HeavyHittersCounter
+
+    def __reduce__(self): # Keeps Capacity and Error when sent to or from the worker processes
+        return self.__class__, (self.Capacity, self.Error), {'Total': self.Total}, None, iter(self.items())
+
+class CountMinCounter(Counter):
+    'Counting with a fixed-size table of estimates (count-min sketch)'
+    # Every item is added to one cell in each of Depth rows of Width cells, and its estimate is the smallest of those cells
+    # Estimates are never lower than the true frequency and are higher by at most Error with a probability of 1 - e ** -Depth
+    # Estimating() answers threshold queries for any item, the Capacity items with the highest estimates are kept as keys to be listed
+    # Kept estimates are only refreshed when their item shows up again, which leaves them between the true frequency and the current estimate
+    # Sketches of the same size are merged with update() by adding up their tables
+    def __init__(self, Capacity=None, Width=None, Depth=None):
+        self.Capacity = Capacity or CountingCapacity
+        self.Table = numpy.zeros((Depth or CountMinDepth, Width or CountMinWidth), dtype=numpy.int64)
+        self.Total = 0
+        super().__init__()
+
+    @property
+    def Error(self):
+        return math.ceil(math.e * self.Total / self.Table.shape[1]) # Returns number
+
+    def Hashing(self, Keys): # Accepts a list of items
+        'Finding the cells of the items in every row'
+        # Hashes don't depend on the process (unlike hash() of a string) so sketches from the worker processes can be merged
+        Digests = numpy.frombuffer(b''.join(hashlib.blake2b(repr(key).encode('utf-8'), digest_size=16).digest() for key in Keys), dtype='<u8').reshape(-1, 2)
+        Rows = numpy.arange(self.Table.shape[0], dtype=numpy.uint64)[:, None]
+        return (Digests[:, 0] + Rows * Digests[:, 1]) % numpy.uint64(self.Table.shape[1]) # Returns a matrix of cells, a row per table row
+
+    def Estimating(self, Keys): # Accepts a list of items
+        'Estimating the frequency of any items'
+        Cells = self.Hashing(Keys)
+        return self.Table[numpy.arange(self.Table.shape[0])[:, None], Cells].min(axis=0) # Returns an array
+
+    def update(self, TextInput=None, **kwargs):
+        if TextInput is None:
+            return # Nothing to count
+        if isinstance(TextInput, CountMinCounter):
+            if TextInput.Table.shape != self.Table.shape:
+                raise ValueError("Only count-min sketches of the same size can be merged.")
+            self.Table += TextInput.Table
+            self.Total += TextInput.Total
+            self.Keeping(list(dict.fromkeys(chain(self, TextInput)))) # Every kept estimate may have grown, the order is kept as Counter would
+            return # Exits the function
+        if isinstance(TextInput, Mapping):
+            Blocks = [TextInput]
+        else:
+            TextInput = iter(TextInput)
+            Blocks = (Counter(Block) for Block in iter(lambda: list(islice(TextInput, CountingBlockSize)), []))
+        for Counts in Blocks: # Every distinct item of a block is hashed once
+            Keys = list(Counts)
+            Values = numpy.fromiter(Counts.values(), dtype=numpy.int64, count=len(Keys))
+            for Row, Cells in enumerate(self.Hashing(Keys)):
+                numpy.add.at(self.Table[Row], Cells, Values)
+            self.Total += int(Values.sum())
+            self.Keeping(Keys)
+
+    def Keeping(self, Keys): # Accepts a list of items
+        'Keeping the items with the highest estimates'
+        for word, freq in zip(Keys, self.Estimating(Keys).tolist()):
+            dict.__setitem__(self, word, freq)
+        if len(self) <= 2 * self.Capacity:
+            return # Exits the function
+        Counts = numpy.fromiter(self.values(), dtype=numpy.int64, count=len(self))
+        Cut = int(numpy.partition(Counts, len(Counts) - self.Capacity)[len(Counts) - self.Capacity]) # Capacity-th largest estimate
+        for word in [word for word, freq in self.items() if freq < Cut]:
+            del self[word]
+
+    def copy(self):
+        TextOutput = self.__class__(self.Capacity, self.Table.shape[1], self.Table.shape[0])
+        TextOutput.Table[:] = self.Table
+        TextOutput.Total = self.Total
+        dict.update(TextOutput, self)
+        return TextOutput # Returns CountMinCounter
+
+    def __reduce__(self): # Keeps the table when sent to or from the worker processes
+        return self.__class__, (self.Capacity, self.Table.shape[1], self.Table.shape[0]), {'Table': self.Table, 'Total': self.Total}, None, iter(self.items())
+
+CountingBackends = {
+    'exact': Counter, # Exact frequencies, memory grows with the number of distinct items
+    'heavyhitters': HeavyHittersCounter, # Fixed memory, frequencies may be lower than the true ones by the error shown
+    'countmin': CountMinCounter, # Fixed memory, frequencies may be higher than the true ones by the error shown
+}
+
+def CounterMaking(TextInput=None, Backend=None): # Accepts an optional iterable or mapping and an optional backend name
+    'Starting the counts with the selected backend'
+    TextOutput = CountingBackends[Backend or CountingBackend]()
+    TextOutput.update(TextInput)
+    return TextOutput # Returns a Counter or one of its approximate kinds
+
+def FrequencyCalc(TextInput, KeyDecoder=None): # Accepts a list or a Counter and an optional function
     'Calculating the frequency'
+    # KeyDecoder turns the keys that made it through the threshold back into text (see the NGramCalc function)
     print("Calculating the frequency...")
     while True: # Prompt the user for a threshold number
         try:
@@ -159,29 +654,221 @@ def FrequencyCalc(TextInput): # Accepts a list
             break # Exits the loop
         except ValueError:
             print("Invalid input. Please enter a valid number.") # Restarts the loop
-    Text = Counter(TextInput)
-    KeyWords = {word: freq for word, freq in Text.items() if freq >= UserThreshold} # Calculating the frequency
     print("Sorting file content...")
-    TextOutput = dict(sorted(KeyWords.items(), key=lambda x: x[1], reverse=True)) # Sorting keywords in reverse
+    Text = TextInput
+    if not isinstance(TextInput, Counter): # Word combinations are counted already (see the NGramCalc function)
+        with Stage('counting', items=len(TextInput)):
+            Text = CounterMaking(TextInput) # Counted once however the result is shown later on
+    TextOutput = FrequencyTable(Text, UserThreshold, KeyDecoder)
     print() # Print a blank line for readability
+    return TextOutput # Returns FrequencyTable
+
+def FrequencyFiltering(TextInput, Threshold, KeyDecoder=None, TopK=None): # Accepts a list or a Counter, a number, an optional function and an optional number
+    'Leaving only the frequent words and sorting them'
+    # With TopK only that many of the most frequent words are picked with a heap instead of sorting all of them
+    # Counting and picking the frequent words are traced as separate stages so that the selection doesn't hide in the counting time
+    Text = TextInput
+    if not isinstance(TextInput, Counter):
+        with Stage('counting', items=len(TextInput)):
+            Text = CounterMaking(TextInput) # Calculating the frequency
+    if getattr(Text, 'Error', 0):
+        print(f"Frequencies are approximate and may be off by up to {Text.Error} (see the CountingBackend setting).")
+    with Stage('selection', items=len(Text)) as Record: # Distinct items filtered
+        KeyWords = ((word, freq) for word, freq in Text.items() if freq >= Threshold)
+        if TopK is None:
+            KeyWords = sorted(KeyWords, key=itemgetter(1), reverse=True) # Sorting keywords in reverse
+        else:
+            KeyWords = heapq.nlargest(TopK, KeyWords, key=itemgetter(1)) # Same order as sorting, ties keep their order
+        TextOutput = {KeyDecoder(word): freq for word, freq in KeyWords} if KeyDecoder is not None else dict(KeyWords)
+        Record['kept'] = len(TextOutput)
     return TextOutput # Returns dictionary
 
-def PlottingTheGraph(TextInput, TextVectors): # Accepts a dictionary and a list of Numpy arrays respectively
+class FrequencyTable(Mapping):
+    'Frequent words that are sorted only once all of them are needed'
+    # The dialogues often print only the top 25 (see the StoringTheResult function), these are picked with a heap and only their keys are decoded
+    # Printing or storing everything, the graph and the similarity sort all of the words once and reuse the result
+    def __init__(self, TextInput, Threshold, KeyDecoder=None): # Accepts a Counter, a number and an optional function
+        self.Text = TextInput
+        self.Threshold = Threshold
+        self.KeyDecoder = KeyDecoder
+        self.Sorted = None
+
+    def Top(self, TopK): # Accepts a number
+        'Picking only the most frequent words'
+        if self.Sorted is not None:
+            return dict(islice(self.Sorted.items(), TopK))
+        return FrequencyFiltering(self.Text, self.Threshold, self.KeyDecoder, TopK=min(TopK, FrequencyTopK or TopK)) # Returns dictionary
+
+    def Sorting(self):
+        'Sorting all of the frequent words'
+        if self.Sorted is None:
+            self.Sorted = FrequencyFiltering(self.Text, self.Threshold, self.KeyDecoder, TopK=FrequencyTopK)
+            self.Text = None # The counts aren't needed anymore
+        return self.Sorted # Returns dictionary
+
+    def __getitem__(self, word):
+        return self.Sorting()[word]
+
+    def __iter__(self):
+        return iter(self.Sorting())
+
+    def __len__(self):
+        return len(self.Sorting())
+
+def ComboRangeParsing(TextInput): # Accepts a string such as '3' or '2-5'
+    'Reading a combination number or a range of them'
+    ComboLow, _, ComboHigh = TextInput.strip().partition('-')
+    ComboNumbers = range(int(ComboLow), int(ComboHigh or ComboLow) + 1)
+    if not ComboNumbers or ComboNumbers.start < 1:
+        raise ValueError(f"invalid combination range: {TextInput!r}") # Empty range or a non-positive number
+    return ComboNumbers # Returns range
+
+def LemmaInterning(TextInput): # Accepts an iterable of strings
+    'Replacing lemmas with integer IDs'
+    # Every distinct lemma is stored once and the text itself becomes a compact array of 4-byte IDs
+    IDs = {}
+    LemmaIDs = array('I', (IDs.setdefault(lemma, len(IDs)) for lemma in TextInput)) # New lemmas get the next free ID
+    return list(IDs), LemmaIDs # Returns a list (ID to lemma) and an array
+
+def NGramCalc(TextInput, ComboNumbers, PruneLimit=None, Backend=None): # Accepts an array of lemma IDs (or any sequence), a range of numbers, an optional number and an optional backend name
+    'Counting word combinations of every selected length'
+    # A window slides over the IDs so the list of all combinations is never built, only the counts are kept
+    # The text is processed in segments overlapping by ComboNumber - 1 IDs for pruning to take place between them
+    for ComboNumber in ComboNumbers:
+        with Stage('combos', combo=ComboNumber, tokens=len(TextInput)):
+            Combos = CounterMaking(Backend=Backend)
+            Ends = len(TextInput) - ComboNumber + 1 # Number of combinations of this length in the text
+            for Start in range(0, Ends, NGramSegmentSize):
+                Segment = TextInput[Start:Start + NGramSegmentSize + ComboNumber - 1]
+                Combos.update(zip(*(islice(Segment, i, None) for i in range(ComboNumber)))) # Tuples of IDs to be used with Counter
+                if PruneLimit is not None and len(Combos) > PruneLimit and Start + NGramSegmentSize < Ends: # Pruning after the last segment would only lose counts
+                    NGramPruning(Combos, PruneLimit)
+        yield ComboNumber, Combos # Returns the counts for one length at a time
+
+def NGramPruning(TextInput, PruneLimit): # Accepts a Counter and a number
+    'Dropping the rarest combinations to keep the memory bounded'
+    # Keeps the PruneLimit // 2 most frequent combinations and removes the rest, so counts of the rare combinations may be underestimated
+    # Combinations tied at the cut are kept in the order they were first seen so exactly that many remain
+    # Set PruneLimit well above the number of combinations you expect to see above the threshold
+    Kept = heapq.nlargest(PruneLimit // 2, TextInput.items(), key=itemgetter(1))
+    Cut = Kept[-1][1] if Kept else 0
+    Dropped = len(TextInput) - len(Kept)
+    Kept = {Combo for Combo, freq in Kept}
+    for Combo in [Combo for Combo in TextInput if Combo not in Kept]:
+        del TextInput[Combo]
+    print(f"Dropped {Dropped} combinations with a frequency of {Cut} or lower to save memory.")
+
+def SimilarityEngine(NLP, TextInput): # Accepts a spaCy language object and an iterable of strings
+    'Gathering the word vectors into a single matrix'
+    # Vectors are taken straight from the model vocabulary so the words aren't joined and parsed again
+    # Words without a vector are left out the same way the former 'word.vector.any()' check did
+    from spacy.attrs import ORTH # Default word vectors key
+    with Stage('vectors') as Record:
+        Words = list(TextInput)
+        WordsTotal = len(Words)
+        Vectors = NLP.vocab.vectors
+        if Vectors.mode == 'default' and getattr(Vectors, 'attr', ORTH) == ORTH:
+            Rows = numpy.asarray(Vectors.find(keys=Words))
+            Words = [word for word, row in zip(Words, Rows) if row >= 0]
+            Matrix = numpy.ascontiguousarray(numpy.asarray(Vectors.data)[Rows[Rows >= 0]], dtype=numpy.float32)
+        else: # Floret vectors or vectors keyed by another attribute have to be looked up one by one
+            Matrix = numpy.array([NLP.vocab.get_vector(word) for word in Words], dtype=numpy.float32).reshape(len(Words), Vectors.shape[1])
+        Norms = numpy.linalg.norm(Matrix, axis=1)
+        Found = Norms > 0
+        print(f"Found word vectors for {int(Found.sum())} words out of {WordsTotal}.")
+        Record['items'] = WordsTotal
+    return [word for word, found in zip(Words, Found) if found], Matrix[Found], Norms[Found] # Returns a list, a matrix and an array
+
+def SimilarityCalc(Engine, QueryVectors, Threshold=None, TopK=None): # Accepts SimilarityEngine output, a list of Numpy arrays, and two optional numbers
+    'Calculating the similarity of every word to every query at once'
+    # Cosine similarity for all the words and all the queries is a single matrix product
+    # Threshold is compared with the similarity in percent and TopK limits the number of results per query
+    with Stage('similarity', items=len(Engine[0]) * len(QueryVectors)):
+        Words, Matrix, Norms = Engine
+        Queries = numpy.asarray(QueryVectors, dtype=numpy.float32).reshape(len(QueryVectors), Matrix.shape[1])
+        QueryNorms = numpy.linalg.norm(Queries, axis=1)
+        QueryNorms[QueryNorms == 0] = numpy.inf # Queries without a vector get zero similarity
+        Similarity = Matrix @ Queries.T / Norms[:, None] / QueryNorms[None, :]
+        Percent = numpy.rint(Similarity * 100) # Rounds half to even just like round()
+        TextOutput = []
+        for Column, ColumnPercent in zip(Similarity.T, Percent.T):
+            Selected = numpy.arange(len(Column)) if Threshold is None else numpy.flatnonzero(ColumnPercent >= Threshold)
+            if TopK is not None and TopK < len(Selected):
+                Selected = Selected[numpy.argpartition(-Column[Selected], TopK - 1)[:TopK]] # Leaves only the TopK best without sorting everything
+                Selected.sort() # Keeps the frequency order for words with equal similarity
+            Selected = Selected[numpy.argsort(-Column[Selected], kind='stable')] # Sorting words in reverse
+            TextOutput.append({Words[i]: int(ColumnPercent[i]) for i in Selected})
+    return TextOutput # Returns a list of dictionaries, one per query
+
+def WordVectors(NLP, TextInput): # Accepts a spaCy language object and an iterable of strings
+    'Gathering the word vectors for the graph'
+    # Vectors are taken straight from the model vocabulary instead of running the whole pipeline once per word
+    # Words the vocabulary doesn't have are only tokenized, so ones made of several tokens still get their average vector
+    from spacy.attrs import ORTH # Default word vectors key
+    Words = list(TextInput)
+    Vectors = NLP.vocab.vectors
+    Matrix = numpy.zeros((len(Words), Vectors.shape[1]), dtype=numpy.float32)
+    if Vectors.mode == 'default' and getattr(Vectors, 'attr', ORTH) == ORTH:
+        Rows = numpy.asarray(Vectors.find(keys=Words))
+        Matrix[Rows >= 0] = numpy.asarray(Vectors.data)[Rows[Rows >= 0]]
+        Missing = numpy.flatnonzero(Rows < 0)
+    else: # Floret vectors or vectors keyed by another attribute have to be looked up one by one
+        Missing = range(len(Words))
+    for i in Missing:
+        Matrix[i] = NLP.make_doc(Words[i]).vector
+    return Matrix # Returns a matrix with a row per word
+
+def PlottingTheGraph(TextInput, TextVectors, FilenameOutput=None): # Accepts a dictionary, a matrix (or a list of Numpy arrays) and an optional filename respectively
     'Plotting the data graph'
     # A very basic MatPlotLib plotting function
-    # Produces relatively good results on small TextInput sizes
     # If you need the graph to be plotted with original word vectors but translated labels the best way would be to just translate the output manually
     # Supply the function with TextInput=TranslatedDictionary and TextVectors=OriginalVectors
     # Be aware that dictionary sizes need to be the same
     # Otherwise TranslatingTheOutput function is commented out later in the script
+    # With FilenameOutput (.png, .svg or anything else MatPlotLib supports) the graph is stored in a file instead of being shown, no display is needed then
+    # MatPlotLib and scikit-learn take a while to import so they are imported only when the graph is needed
+    # Stored graphs are drawn on a standalone figure without pyplot, so its backend isn't switched and later graphs are still shown
+    import matplotlib
+    from matplotlib.figure import Figure # Renders without a display
+    from sklearn.decomposition import PCA, IncrementalPCA # Vector dimensions reduction
     print("Plotting the data graph...")
-    PCAResult = PCA(n_components=2).fit_transform(TextVectors) # Reducing the dimensions of vectors
-    PLT.figure(figsize=(10, 10))
-    for i, word in enumerate(TextInput.keys()):
-        PLT.scatter(PCAResult[i, 0], PCAResult[i, 1])
-        PLT.text(PCAResult[i, 0], PCAResult[i, 1], word)
+    Words = list(TextInput.keys())
+    TextVectors = numpy.asarray(TextVectors, dtype=numpy.float32)
+    if len(Words) < 2:
+        print("At least two words are needed for the graph.")
+        return # Exits the function
+    with Stage('plotting', items=len(Words)): # Showing the graph isn't measured as it lasts until the window is closed
+        if len(Words) > PlottingIncrementalLimit: # Fits the vectors batch by batch to save memory
+            PCAResult = IncrementalPCA(n_components=2, batch_size=PlottingBatchSize).fit_transform(TextVectors)
+        else:
+            PCAResult = PCA(n_components=2, svd_solver=PlottingSolver, random_state=0).fit_transform(TextVectors) # Reducing the dimensions of vectors
+        if FilenameOutput is None:
+            import matplotlib.pyplot as PLT # Visual plotting
+            if matplotlib.get_backend().lower() in ('agg', 'pdf', 'ps', 'svg', 'cairo', 'template'): # PyPlot picks one of these when there's no display
+                FilenameOutput = PlottingDefaultFilename # There's no display to show the graph on
+        Graph = PLT.figure(figsize=(10, 10)) if FilenameOutput is None else Figure(figsize=(10, 10))
+        Axes = Graph.add_subplot()
+        Axes.scatter(PCAResult[:, 0], PCAResult[:, 1], c=[f'C{i % 10}' for i in range(len(Words))]) # Same colours the points got one by one
+        for i in PlottingLabels(PCAResult):
+            Axes.text(PCAResult[i, 0], PCAResult[i, 1], Words[i])
+        if FilenameOutput is not None:
+            Graph.savefig(FilenameOutput, bbox_inches='tight')
     print() # Print a blank line for readability
-    PLT.show()
+    if FilenameOutput is None:
+        PLT.show()
+        return # Exits the function
+    print(f"Graph successfully stored in {FilenameOutput}.")
+
+def PlottingLabels(PCAResult): # Accepts a matrix with two columns
+    'Choosing the points to label so that the labels stay readable'
+    # The graph is divided into a grid and only the first word in every cell gets a label
+    # Words come sorted by frequency or similarity so the most important ones are labelled
+    if PlottingLabelGrid is None or len(PCAResult) <= PlottingLabelGrid:
+        return range(len(PCAResult)) # Few enough labels to show them all
+    Low, High = PCAResult.min(axis=0), PCAResult.max(axis=0)
+    Cells = numpy.floor((PCAResult - Low) / numpy.where(High > Low, High - Low, 1) * (PlottingLabelGrid - 1)).astype(numpy.int64)
+    _, First = numpy.unique(Cells[:, 0] * PlottingLabelGrid + Cells[:, 1], return_index=True)
+    return numpy.sort(First) # Returns a range or an array of indices
 
 # Here's an output translation function using MyMemory free translation provider
 # It produces relatively poor results thus it's currently deprecated
@@ -196,6 +883,11 @@ def PlottingTheGraph(TextInput, TextVectors): # Accepts a dictionary and a list
 #         TranslatedDictionary[TranslatedWord] = TextInput[word]
 #     return TranslatedDictionary
 
+def PlottingFileSelection():
+    'Asking whether to show the graph or to store it'
+    FilenameOutput = input("Please enter a filename to store the graph in (e.g. graph.png or graph.svg) or leave it empty to show it: ").strip()
+    return FilenameOutput or None # Returns string or None
+
 def StoringTheResult(TextInput):
     'Printing or storing script output'
     print("Please choose one of the following options...")
@@ -213,21 +905,15 @@ def StoringTheResult(TextInput):
             break # Exits the loop
         elif StoringUserChoice == 'top':
             print("Processed content (top 25): ")
-            count = 0
-            for word, value in TextInput.items():
-                if count >= 25: # Could've been 50 or more but 25 is fine for the use case of many-word combos or heavily filtered text
-                    break # Exits the loop
+            # Could've been 50 or more but 25 is fine for the use case of many-word combos or heavily filtered text
+            TopText = TextInput.Top(25) if isinstance(TextInput, FrequencyTable) else dict(islice(TextInput.items(), 25)) # Frequencies aren't sorted in full for it
+            for word, value in TopText.items():
                 print(f'Word: {word}, Value: {value}')
-                count += 1
             break # Exits the loop
         elif StoringUserChoice == 'store':
-            FilenameOutput = input("Enter the filename to store the result: ").strip()
+            FilenameOutput = input("Enter the filename to store the result (.txt, .tsv, .csv, .jsonl or .qnf for a binary table, add .gz or .zst to compress): ").strip()
             try:
-                with open(FilenameOutput, 'w', encoding='utf-8') as fileout:
-                    for word, value in TextInput.items():
-                        fileout.write(f'Word: {word}, Value: {value}')
-                        fileout.write('\n') # Ugly but gets the job done
-                print(f"Result successfully stored in {FilenameOutput}.") # Doesn't indicate whether anything has been written for a case of an empty output
+                ResultWriting(TextInput, FilenameOutput)
             except Exception as e:
                 print(f"An error occurred while storing the result: {e}")
                 sys.exit(1) # Exits the script
@@ -235,107 +921,846 @@ def StoringTheResult(TextInput):
         else:
             print("Invalid choice. Please enter either 'print' or 'top' or 'store'.") # Restarts the loop
 
-# Actual program starts here
-# Introduction
-print("Welcome to QuickNLPFreqTool: Basic Python NLP and Analysis Script v. 0.8.1.")
-print("You can get an overview and version history on the Github page.")
-print("The script will guide you through its process with different options mainly centered around Russian or English language models to use.")
-print("Be aware that sometimes the script has to be run several times with different settings for you to get the desired output.")
-print("Also note that while the script has been tested on Russian and English texts and various exceptions have been added it's not guaranteed to work every time.")
-print() # Print a blank line for readability
-
-# File input dialogue
-print("Select a text file encoded with UTF-8.")
-print("If later on you encounter an error specific to your input file try to edit the file first.")
-print("You're free to edit the script as well obviously. Some possible settings to edit are discussed in the comments inside.")
-FilenameInput = input("Please enter the filename to open: ") # Selecting the file to process
-try:
-    with open(FilenameInput, 'r', encoding='utf-8') as file: # Opening the file
-        ReadText = file.read()
-except FileNotFoundError:
-    print("Error: File not found. Please check the filename and try again.")
-    sys.exit(1) # Exits the script
-except Exception as e:
-    print(f"An error occurred: {e}")
-    sys.exit(1) # Exits the script
-print() # Print a blank line for readability
-
-# Main body
-print("Please choose one of the following options...")
-print("words: Calculate the frequency of individual words")
-print("combos: Process word combinations of selected length")
-print("vectors: Use words vectors of a trained model to find similar words")
-while True:
-    ProcessingUserChoice = input("Your selection: words/combos/vectors: ").strip().lower()
-    if ProcessingUserChoice == 'words': # Choice №1
-        print() # Print a blank line for readability
-        print("Proceeding with individual words...")
-        FilteredText = TextPreparation(ReadText)
-        NLP = NLPSelection()
-        ProcessedText = NLP(FilteredText)
-        Lemmas = Lemmatization(ProcessedText)
-        SortedText = FrequencyCalc(Lemmas)
-        StoringTheResult(SortedText)
-        if input("Do you want to see word vectors of the script output in a handy graph? (y/n) ").strip().lower() == 'y':
-            SortedTextVectors = [NLP(word).vector for word in SortedText] # List of Numpy arrays
-            PlottingTheGraph(TextInput=SortedText, TextVectors=SortedTextVectors)
-        print("Thank you for using QuickNLPFreqTool!")
-        sys.exit(0) # Exits the script
-    elif ProcessingUserChoice == 'combos': # Choice №2
-        print() # Print a blank line for readability
-        print("Proceeding with word combinations...")
-        FilteredText = TextPreparation(ReadText)
-        NLP = NLPSelection()
-        ProcessedText = NLP(FilteredText)
-        Lemmas = Lemmatization(ProcessedText)
-        while True:
+def ResultWriting(TextInput, FilenameOutput): # Accepts a dictionary (or any iterable of word and value pairs) and a filename
+    'Storing script output in a file'
+    # The format is picked by the extension (see ResultFormats), .gz or .zst after it compresses the file on the fly
+    # Entries are written a block at a time so the whole formatted output is never kept in memory
+    Format, Compression = ResultFormatting(FilenameOutput)
+    Entries = iter(TextInput.items() if isinstance(TextInput, Mapping) else TextInput)
+    if Format == '.qnf' and Compression is not None:
+        raise ValueError("Binary tables can't be compressed, they are meant to be memory-mapped.")
+    with Stage('storing', target=FilenameOutput) as Record:
+        if Format == '.qnf':
+            TableWriting(Entries, FilenameOutput)
+        else:
+            with ResultOpening(FilenameOutput, Compression, 'w', None if Format == '.txt' else '') as fileout: # Plain text gets the platform line ends as before
+                ResultFormats[Format](Entries, fileout)
+        if isinstance(TextInput, Mapping):
+            Record['items'] = len(TextInput)
+    print(f"Result successfully stored in {FilenameOutput}.") # Doesn't indicate whether anything has been written for a case of an empty output
+
+def ResultFormatting(Filename): # Accepts a filename
+    'Telling the format and the compression of a result file by its extension'
+    Root, Compression = os.path.splitext(Filename.lower())
+    if Compression not in ('.gz', '.zst'):
+        Root, Compression = Filename.lower(), None
+    Format = os.path.splitext(Root)[1]
+    return (Format if Format in ResultFormats else '.txt'), Compression # Returns two strings, unknown extensions get the plain text format
+
+def ResultOpening(Filename, Compression, Mode, Newline=''): # Accepts a filename, '.gz', '.zst' or None, 'r' or 'w', and the newline argument of open()
+    'Opening a result file as text with the compression and a large buffer'
+    if Compression == '.gz':
+        Stream = gzip.open(Filename, Mode + 'b', compresslevel=6) # Level 6 is much faster than the default 9 and nearly as small
+    elif Compression == '.zst':
+        try:
+            from compression import zstd # Python 3.14 and later
+            Stream = zstd.open(Filename, Mode + 'b')
+        except ImportError:
             try:
-                ComboNumber = int(input("Please enter a combination number (e.g. 3 for 3-word combinations): "))
-                print(f"You entered the number: {ComboNumber}") # Gets the combination length
-                break # Exits the loop
-            except ValueError:
-                print("Invalid input. Please enter a valid number.") # Restarts the loop
-        Combos = []
-        for i in range(len(Lemmas) - (ComboNumber - 1)):
-            Combo = tuple(Lemmas[i:i + ComboNumber]) # Tuple type set to be used with Counter later
-            Combos.append(Combo)
-        SortedCombos = FrequencyCalc(Combos)
+                import zstandard # Optional dependency, 'pip install zstandard'
+            except ImportError:
+                raise ValueError("Storing .zst files requires Python 3.14 or the 'zstandard' package (pip install zstandard).") from None
+            Stream = zstandard.open(Filename, Mode + 'b')
+    else:
+        Stream = open(Filename, Mode + 'b', buffering=WritingBufferSize)
+    return io.TextIOWrapper(Stream, encoding='utf-8', newline=Newline) # Returns a text file object
+
+def LegacyWriting(Entries, fileout): # Accepts an iterator of word and value pairs and a text file object
+    'Writing the original "Word: x, Value: y" lines'
+    while Block := list(islice(Entries, WritingBlockSize)):
+        fileout.write(''.join([f'Word: {word}, Value: {value}\n' for word, value in Block]))
+
+def DelimitedWriting(Entries, fileout, Delimiter): # Accepts an iterator of word and value pairs, a text file object and a delimiter
+    'Writing a table with a header, a column per word of a combination and a column for the value'
+    # Quoting follows the csv module rules so words with tabs, commas or quotes in them are read back as they were
+    First = next(Entries, None)
+    Writer = csv.writer(fileout, delimiter=Delimiter, lineterminator='\n')
+    if First is None:
+        Writer.writerow(['word', 'value'])
+        return # Exits the function
+    ComboNumber = len(First[0]) if isinstance(First[0], tuple) else 0
+    Writer.writerow([f'word{i + 1}' for i in range(ComboNumber)] + ['value'] if ComboNumber else ['word', 'value'])
+    Rows = ((*word, value) for word, value in chain([First], Entries)) if ComboNumber else chain([First], Entries)
+    while Block := list(islice(Rows, WritingBlockSize)):
+        Writer.writerows(Block)
+
+def JSONLinesWriting(Entries, fileout): # Accepts an iterator of word and value pairs and a text file object
+    'Writing a JSON object per line, word combinations become lists'
+    Encoder = json.encoder.encode_basestring # Same as json.dumps(word, ensure_ascii=False) for a string but much faster
+    while Block := list(islice(Entries, WritingBlockSize)):
+        fileout.write(''.join([f'{{"word": {"[" + ", ".join(map(Encoder, word)) + "]" if isinstance(word, tuple) else Encoder(word)}, "value": {value}}}\n' for word, value in Block]))
+
+def TableWriting(Entries, FilenameOutput): # Accepts an iterator of word and value pairs and a filename
+    'Writing a binary table that can be looked up without reading it (see the ResultTable class)'
+    # Layout: a header, then offsets of the words into the text, values, the original order (all 8-byte numbers), then the UTF-8 text of the words sorted by their bytes
+    # Words of a combination are joined with the unit separator character
+    Words, Values = [], array('q')
+    ComboNumber = 0
+    for word, value in Entries:
+        if isinstance(word, tuple):
+            ComboNumber = len(word)
+            word = '\x1f'.join(word)
+        Words.append(word.encode('utf-8'))
+        Values.append(value)
+    Order = sorted(range(len(Words)), key=Words.__getitem__)
+    Offsets = numpy.zeros(len(Words) + 1, dtype='<u8')
+    numpy.cumsum([len(Words[i]) for i in Order], out=Offsets[1:])
+    Rank = numpy.empty(len(Words), dtype='<u8')
+    Rank[numpy.asarray(Order, dtype=numpy.int64)] = numpy.arange(len(Words), dtype='<u8') # Position of every word of the original order in the sorted table
+    with open(FilenameOutput, 'wb', buffering=WritingBufferSize) as fileout:
+        fileout.write(TableHeader.pack(TableMagic, TableVersion, ComboNumber, len(Words)))
+        fileout.write(Offsets.tobytes())
+        fileout.write(numpy.asarray(Values, dtype='<i8')[Order].tobytes())
+        fileout.write(Rank.tobytes())
+        for Start in range(0, len(Order), WritingBlockSize):
+            fileout.write(b''.join([Words[i] for i in Order[Start:Start + WritingBlockSize]]))
+
+class ResultTable(Mapping):
+    'Looking up the words of a binary table without reading it (see the TableWriting function)'
+    # The file is memory-mapped so only the pages that are looked at are read from the disk
+    # Words are found with a binary search, iterating goes in the original order (by frequency or similarity)
+    def __init__(self, FilenameInput):
+        with open(FilenameInput, 'rb') as filein:
+            self.Map = mmap.mmap(filein.fileno(), 0, access=mmap.ACCESS_READ)
+        Magic, Version, self.ComboNumber, Size = TableHeader.unpack_from(self.Map)
+        if Magic != TableMagic or Version != TableVersion:
+            raise ValueError(f"{FilenameInput} is not a QuickNLPFreqTool table.")
+        self.Offsets = numpy.frombuffer(self.Map, dtype='<u8', count=Size + 1, offset=TableHeader.size)
+        self.Values = numpy.frombuffer(self.Map, dtype='<i8', count=Size, offset=TableHeader.size + 8 * (Size + 1))
+        self.Rank = numpy.frombuffer(self.Map, dtype='<u8', count=Size, offset=TableHeader.size + 8 * (2 * Size + 1))
+        self.TextStart = TableHeader.size + 8 * (3 * Size + 1)
+
+    def Word(self, i): # Accepts a position in the sorted table
+        word = self.Map[self.TextStart + int(self.Offsets[i]):self.TextStart + int(self.Offsets[i + 1])].decode('utf-8')
+        return tuple(word.split('\x1f')) if self.ComboNumber else word # Returns string or tuple
+
+    def __getitem__(self, word):
+        Key = ('\x1f'.join(word) if isinstance(word, tuple) else word).encode('utf-8')
+        Low, High = 0, len(self.Values)
+        while Low < High: # Binary search over the sorted words
+            Middle = (Low + High) // 2
+            if self.Map[self.TextStart + int(self.Offsets[Middle]):self.TextStart + int(self.Offsets[Middle + 1])] < Key:
+                Low = Middle + 1
+            else:
+                High = Middle
+        if Low < len(self.Values) and self.Map[self.TextStart + int(self.Offsets[Low]):self.TextStart + int(self.Offsets[Low + 1])] == Key:
+            return int(self.Values[Low])
+        raise KeyError(word)
+
+    def __iter__(self):
+        return (self.Word(int(i)) for i in self.Rank)
+
+    def __len__(self):
+        return len(self.Values)
+
+    def items(self):
+        return ((self.Word(int(i)), int(self.Values[i])) for i in self.Rank) # Returns a generator of word and value pairs in the original order
+
+def ResultLoading(FilenameInput): # Accepts a filename
+    'Reading a result stored in any of the structured formats back'
+    Format, Compression = ResultFormatting(FilenameInput)
+    if Format == '.qnf':
+        return ResultTable(FilenameInput) # Returns ResultTable
+    if Format == '.txt':
+        raise ValueError("Plain text results can't be read back, store them as .tsv, .csv, .jsonl or .qnf instead.")
+    with ResultOpening(FilenameInput, Compression, 'r') as filein:
+        if Format == '.jsonl':
+            return {tuple(Entry['word']) if isinstance(Entry['word'], list) else Entry['word']: Entry['value'] for Entry in map(json.loads, filein)} # Returns dictionary
+        Reader = csv.reader(filein, delimiter='\t' if Format == '.tsv' else ',')
+        if next(Reader, ['word'])[0] == 'word': # Individual words, otherwise the header is 'word1', 'word2' and so on
+            return {Row[0]: int(Row[1]) for Row in Reader} # Returns dictionary
+        return {tuple(Row[:-1]): int(Row[-1]) for Row in Reader} # Returns dictionary
+
+ResultFormats = {
+    '.txt': LegacyWriting, # "Word: x, Value: y" lines as before
+    '.tsv': lambda Entries, fileout: DelimitedWriting(Entries, fileout, '\t'),
+    '.csv': lambda Entries, fileout: DelimitedWriting(Entries, fileout, ','),
+    '.jsonl': JSONLinesWriting,
+    '.qnf': None, # Binary table (see the TableWriting function)
+}
+
+# Tracing (see comments in the Stage function)
+def TracingStarting(Settings): # Accepts a dictionary with the 'file', 'cprofile' and 'memory' keys
+    'Turning the stage measurements on'
+    # Called in the main process and once more in every worker process
+    TracingSettings.update(Settings)
+
+@contextlib.contextmanager
+def Stage(Name, **Details): # Accepts one of the TracingStages and anything worth recording along with the measurements
+    'Measuring a stage of the script when tracing is on'
+    # Records wall time, CPU time (along with the finished child processes), peak RSS and the throughput of the stage
+    # The caller may add 'chars', 'tokens' or 'items' to the yielded dictionary for the throughput to be calculated
+    # cProfile and tracemalloc are only run within the stage selected for them as they slow everything down
+    Record = {'stage': Name, **Details}
+    if not TracingSettings:
+        yield Record
+        return # Tracing is off
+    Profiler = cProfile.Profile() if TracingSettings.get('cprofile') == Name else None
+    Memory = TracingSettings.get('memory') == Name
+    RSSResetting()
+    if Memory:
+        tracemalloc.start()
+    Wall, CPU = time.perf_counter(), sum(os.times()[:4])
+    if Profiler is not None:
+        Profiler.enable()
+    try:
+        yield Record
+    finally:
+        if Profiler is not None:
+            Profiler.disable()
+            ProfileFilename = f"{os.path.splitext(TracingSettings['file'])[0]}.{Name}.{os.getpid()}.prof"
+            Profiler.dump_stats(ProfileFilename) # Open it with 'python -m pstats' or snakeviz
+            Record['cprofile'] = ProfileFilename
+        Record['wall'] = round(time.perf_counter() - Wall, 4)
+        Record['cpu'] = round(sum(os.times()[:4]) - CPU, 4)
+        if Memory:
+            Record['python_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1048576, 1)
+            Record['top_allocations'] = [str(Statistic) for Statistic in tracemalloc.take_snapshot().statistics('lineno')[:10]]
+            tracemalloc.stop()
+        TracingFinishing(Record)
+
+def StageStreaming(Record, TextInput): # Accepts a dictionary made the same way the Stage function does and an iterable of strings
+    'Measuring the time spent on producing a stream of text chunks when tracing is on'
+    # Text preparation is streamed into the parsing so only the time spent inside the stream itself is counted here
+    # The parsing stage includes this time as well
+    if not TracingSettings:
+        yield from TextInput
+        return # Tracing is off
+    TextInput = iter(TextInput)
+    Record.update(wall=0.0, cpu=0.0, chars=0)
+    while True:
+        Wall, CPU = time.perf_counter(), time.process_time()
+        Chunk = next(TextInput, None)
+        Record['wall'] += time.perf_counter() - Wall
+        Record['cpu'] += time.process_time() - CPU
+        if Chunk is None:
+            break # Exits the loop
+        Record['chars'] += len(Chunk)
+        yield Chunk
+    Record['wall'], Record['cpu'] = round(Record['wall'], 4), round(Record['cpu'], 4)
+    TracingFinishing(Record)
+
+def TracingFinishing(Record): # Accepts a dictionary with the measurements of a stage
+    'Adding up the measurements of a stage and reporting them'
+    Record['peak_rss_mb'], Record['children_peak_rss_mb'] = PeakRSS()
+    Record['pid'] = os.getpid()
+    Throughput = ''
+    for Unit in ('chars', 'tokens', 'items'):
+        if Unit in Record and Record['wall'] >= 0.001: # Too short a stage to tell
+            Record[f'{Unit}_per_second'] = round(Record[Unit] / Record['wall'])
+            Throughput += f", {Record[f'{Unit}_per_second']} {Unit} per second"
+    TracingRecords.append(Record)
+    print(f"[trace] {Record['stage']}: {Record['wall']:.2f} s wall, {Record['cpu']:.2f} s CPU, {Record['peak_rss_mb']} MB peak RSS{Throughput}")
+
+def TracingTaking(): # Used by the worker processes
+    'Handing the measurements over to the main process'
+    Records = TracingRecords[:]
+    TracingRecords.clear()
+    return Records # Returns list
+
+def RSSResetting():
+    'Starting the peak memory measurement of a stage anew'
+    try:
+        with open('/proc/self/clear_refs', 'w') as fileout:
+            fileout.write('5') # Linux only, resets the peak resident set size of the process
+    except OSError:
+        pass # Elsewhere the peak of the whole run so far is reported
+
+def PeakRSS():
+    'Reading the peak resident set size of the process and of its finished child processes'
+    Peak = None
+    try:
+        with open('/proc/self/status') as filein:
+            Peak = next((int(line.split()[1]) / 1024 for line in filein if line.startswith('VmHWM:')), None)
+    except OSError:
+        pass # Not Linux
+    if resource is None: # Not available on Windows
+        return Peak, None
+    Unit = 1048576 if sys.platform == 'darwin' else 1024 # Bytes on macOS and kilobytes elsewhere
+    if Peak is None:
+        Peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / Unit
+    return round(Peak, 1), round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / Unit, 1) # Returns two numbers in megabytes
+
+def TracingWriting(Started): # Accepts the time.time() of the start of the run
+    'Storing the measurements of the run in a JSON file and summarizing them'
+    Summary = {}
+    for Record in sorted(TracingRecords, key=lambda Record: TracingStages.index(Record['stage'])): # In the order of the pipeline
+        Total = Summary.setdefault(Record['stage'], {'count': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_rss_mb': 0.0})
+        Total['count'] += 1
+        Total['wall'] = round(Total['wall'] + Record['wall'], 4)
+        Total['cpu'] = round(Total['cpu'] + Record['cpu'], 4)
+        Total['peak_rss_mb'] = max(Total['peak_rss_mb'], Record['peak_rss_mb'] or 0)
+    Trace = {
+        'version': ScriptVersion,
+        'arguments': sys.argv[1:],
+        'python': platform.python_version(),
+        'spacy': getattr(sys.modules.get('spacy'), '__version__', None), # Not imported by the runs handed over to the daemon
+        'platform': platform.platform(),
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(Started)),
+        'wall': round(time.time() - Started, 4),
+        'peak_rss_mb': PeakRSS()[0], # Of the whole run unless a stage has reset it (on Linux)
+        'summary': Summary,
+        'stages': TracingRecords,
+    }
+    print("[trace] Stage summary (parsing includes the preparation streamed into it):")
+    for Name, Total in Summary.items():
+        print(f"[trace] {Name:<12} x{Total['count']:<5} {Total['wall']:>10.2f} s wall {Total['cpu']:>10.2f} s CPU {Total['peak_rss_mb']:>10} MB peak RSS")
+    with open(TracingSettings['file'], 'w', encoding='utf-8') as fileout:
+        json.dump(Trace, fileout, ensure_ascii=False, indent=1)
+    print(f"Trace successfully stored in {TracingSettings['file']}.")
+
+# Modes and entry points
+def WordsMode(FilenameInput): # Accepts a filename
+    'Calculating the frequency of individual words'
+    print("Proceeding with individual words...")
+    Profile = ProfileSelection()
+    ModelName = NLPSelection('words')
+    Lemmas = Lemmatization(ParsedTextLoading(FilenameInput, Profile, ModelName))
+    SortedText = FrequencyCalc(Lemmas)
+    StoringTheResult(SortedText)
+    if input("Do you want to see word vectors of the script output in a handy graph? (y/n) ").strip().lower() == 'y':
+        NLP = NLPLoading(ModelName)
+        if NLP.vocab.vectors.size == 0: # Small models have no word vectors
+            print("The selected model has no word vectors to plot. Please use the 'lg' or 'md' model for the graph.")
+        else:
+            SortedTextVectors = WordVectors(NLP, SortedText) # Matrix with a row per word
+            PlottingTheGraph(TextInput=SortedText, TextVectors=SortedTextVectors, FilenameOutput=PlottingFileSelection())
+
+def CombosMode(FilenameInput): # Accepts a filename
+    'Calculating the frequency of word combinations'
+    print("Proceeding with word combinations...")
+    Profile = ProfileSelection()
+    ModelName = NLPSelection('combos')
+    Lemmas = Lemmatization(ParsedTextLoading(FilenameInput, Profile, ModelName))
+    while True:
+        try:
+            ComboUserInput = input("Please enter a combination number or a range (e.g. 3 for 3-word combinations or 2-5 for all of 2- to 5-word ones): ").strip()
+            ComboNumbers = ComboRangeParsing(ComboUserInput)
+            print(f"You entered: {ComboUserInput}") # Gets the combination lengths
+            break # Exits the loop
+        except ValueError:
+            print("Invalid input. Please enter a valid number or range.") # Restarts the loop
+    Vocabulary, LemmaIDs = LemmaInterning(Lemmas)
+    del Lemmas # Only the compact IDs are needed from now on
+    for ComboNumber, Combos in NGramCalc(LemmaIDs, ComboNumbers, PruneLimit=NGramPruneLimit):
+        print(f"Processing {ComboNumber}-word combinations...")
+        SortedCombos = FrequencyCalc(Combos, KeyDecoder=lambda Combo: tuple(Vocabulary[i] for i in Combo))
         StoringTheResult(SortedCombos)
-        print("Thank you for using QuickNLPFreqTool!")
-        sys.exit(0) # Exits the script
-    elif ProcessingUserChoice == 'vectors': # Choice №3
-        print() # Print a blank line for readability
-        print("Proceeding with word vectors...")
-        FilteredText = TextPreparation(ReadText)
-        NLP = NLPSelection()
-        ProcessedText = NLP(FilteredText)
-        Lemmas = Lemmatization(ProcessedText)
-        SortedText = FrequencyCalc(Lemmas)
-        SortedWords = NLP(' '.join(SortedText.keys())) # SpaCy needs to be applied on a string
-        print("The script will now attempt to find words similar to the one you type in...")
-        WordToFindSimilarTo = NLP(input("Enter the word in raw text format (no checks will be made): ").strip().lower())
-        WordSimilarOutput = {}
-        for word in SortedWords:
-            if word.vector.any() != 0: # If there exists a vector for that word
-                WordSimilarity = word.similarity(WordToFindSimilarTo)
-                WordSimilarOutput[word] = WordSimilarity
-        print("Sorting file content...")
-        WordSimilarSorted = dict(sorted(WordSimilarOutput.items(), key=lambda x: x[1], reverse=True)) # Sorting vectors in reverse
-        WordSimilar100Percent = {word: round(similarity * 100) for word, similarity in WordSimilarSorted.items()}
-        print("Calculating the similarity...")
-        while True: # Prompt the user for a similarity number
-            try:
-                SimilarityUserThreshold = int(input("Please enter a threshold number (no results with a similarity lower than it will be shown): "))
-                print(f"You entered the number: {SimilarityUserThreshold}") # Gets the threshold
-                break # Exits the loop
-            except ValueError:
-                print("Invalid input. Please enter a valid number.") # Restarts the loop
-        WordSimilarThreshold = {word.text: freq for word, freq in WordSimilar100Percent.items() if freq >= SimilarityUserThreshold} # Calculating the frequency
+
+def VectorsMode(FilenameInput): # Accepts a filename
+    'Finding words similar to the ones the user types in'
+    print("Proceeding with word vectors...")
+    Profile = ProfileSelection()
+    ModelName = NLPSelection('vectors')
+    Lemmas = Lemmatization(ParsedTextLoading(FilenameInput, Profile, ModelName))
+    SortedText = FrequencyCalc(Lemmas)
+    NLP = NLPLoading(ModelName)
+    Engine = SimilarityEngine(NLP, SortedText.keys())
+    print("The script will now attempt to find words similar to the ones you type in...")
+    while True: # Prompt the user for one or more words
+        Queries = [word.strip().lower() for word in input("Enter the words in raw text format separated by commas (no checks will be made): ").split(',') if word.strip()]
+        if Queries:
+            break # Exits the loop
+        print("Invalid input. Please enter at least one word.") # Restarts the loop
+    while True: # Prompt the user for a similarity number
+        try:
+            SimilarityUserThreshold = int(input("Please enter a threshold number (no results with a similarity lower than it will be shown): "))
+            print(f"You entered the number: {SimilarityUserThreshold}") # Gets the threshold
+            break # Exits the loop
+        except ValueError:
+            print("Invalid input. Please enter a valid number.") # Restarts the loop
+    print("Calculating the similarity...")
+    QueryVectors = [NLP.make_doc(word).vector for word in Queries] # Multi-word queries get the average vector
+    WordSimilarResults = SimilarityCalc(Engine, QueryVectors, Threshold=SimilarityUserThreshold, TopK=SimilarityTopK)
+    for Query, WordSimilarThreshold in zip(Queries, WordSimilarResults):
+        print(f"Words similar to '{Query}'...")
         StoringTheResult(WordSimilarThreshold)
         if input("Do you want to present the results in a handy graph? (y/n) ").strip().lower() == 'y':
-            WordSimilarVectors = [NLP(word).vector for word in WordSimilarThreshold]
-            PlottingTheGraph(TextInput=WordSimilarThreshold, TextVectors=WordSimilarVectors)
-        print("Thank you for using QuickNLPFreqTool!")
-        sys.exit(0) # Exits the script
+            WordSimilarVectors = WordVectors(NLP, WordSimilarThreshold)
+            PlottingTheGraph(TextInput=WordSimilarThreshold, TextVectors=WordSimilarVectors, FilenameOutput=PlottingFileSelection())
+
+def InteractiveMain():
+    'Guiding the user through the script dialogues'
+    # Introduction
+    print(f"Welcome to QuickNLPFreqTool: Basic Python NLP and Analysis Script v. {ScriptVersion}.")
+    print("You can get an overview and version history on the Github page.")
+    print("The script will guide you through its process with different options mainly centered around Russian or English language models to use.")
+    print("Be aware that sometimes the script has to be run several times with different settings for you to get the desired output.")
+    print("Also note that while the script has been tested on Russian and English texts and various exceptions have been added it's not guaranteed to work every time.")
+    print("Run the script with --help to see how to process many files at once without the dialogues.")
+    print() # Print a blank line for readability
+
+    # File input dialogue
+    print("Select a text file encoded with UTF-8.")
+    print("If later on you encounter an error specific to your input file try to edit the file first.")
+    print("You're free to edit the script as well obviously. Some possible settings to edit are discussed in the comments inside.")
+    FilenameInput = input("Please enter the filename to open: ") # Selecting the file to process
+    try:
+        open(FilenameInput, 'r', encoding='utf-8').close() # Checking the file, it's read later on block by block
+    except FileNotFoundError:
+        print("Error: File not found. Please check the filename and try again.")
+        sys.exit(1) # Exits the script
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        sys.exit(1) # Exits the script
+    print() # Print a blank line for readability
+
+    # Main body
+    print("Please choose one of the following options...")
+    print("words: Calculate the frequency of individual words")
+    print("combos: Process word combinations of selected length")
+    print("vectors: Use words vectors of a trained model to find similar words")
+    Modes = {'words': WordsMode, 'combos': CombosMode, 'vectors': VectorsMode}
+    while True:
+        ProcessingUserChoice = input("Your selection: words/combos/vectors: ").strip().lower()
+        if ProcessingUserChoice in Modes:
+            print() # Print a blank line for readability
+            try:
+                Modes[ProcessingUserChoice](FilenameInput)
+            except (OSError, UnicodeError) as e: # Raised by TextReading while the file is read block by block
+                print(f"An error occurred while reading the file: {e}")
+                sys.exit(1) # Exits the script
+            print("Thank you for using QuickNLPFreqTool!")
+            sys.exit(0) # Exits the script
+        else:
+            print("Invalid choice. Please enter either 'words' or 'combos' or 'vectors'.") # Restarts the loop
+
+def FileAnalysis(FilenameInput, Arguments): # Accepts a filename and ArgumentsParsing output
+    'Counting the frequency in a single file without any dialogues'
+    # Runs in the batch worker processes, every process loads the model once (see the NLPLoading function)
+    # Returns the raw counts so that the results of many files can be added up
+    ParsedText = ParsedTextLoading(FilenameInput, Arguments.profile, Arguments.model, Processes=1) # Workers are processes already
+    if Arguments.exclude:
+        Lemmas = LemmaFiltering(ParsedText, set(Arguments.exclude.upper().split(',')), Keep=False)
+    elif Arguments.filter == 'y':
+        Lemmas = LemmaFiltering(ParsedText, ContentWords, Keep=True)
+    else:
+        Lemmas = LemmaFiltering(ParsedText, set(), Keep=False)
+    if Arguments.mode != 'combos': # The 'vectors' mode starts with the frequency of individual words as well
+        with Stage('counting', file=FilenameInput, items=len(Lemmas)):
+            TextOutput = {1: CounterMaking(Lemmas, Arguments.counter)}
+        return FilenameInput, TextOutput, TracingTaking()
+    if Arguments.counter != 'exact': # Approximate counts can't be turned from IDs into text afterwards so they're made of text right away
+        return FilenameInput, dict(NGramCalc(Lemmas, Arguments.combo, PruneLimit=NGramPruneLimit, Backend=Arguments.counter)), TracingTaking()
+    Vocabulary, LemmaIDs = LemmaInterning(Lemmas)
+    del Lemmas # Only the compact IDs are needed from now on
+    TextOutput = {}
+    for ComboNumber, Combos in NGramCalc(LemmaIDs, Arguments.combo, PruneLimit=NGramPruneLimit):
+        TextOutput[ComboNumber] = Counter({tuple(Vocabulary[i] for i in Combo): freq for Combo, freq in Combos.items()}) # IDs differ from file to file
+    return FilenameInput, TextOutput, TracingTaking() # Returns string, a dictionary of Counters, one per combination number, and the stage measurements
+
+def VectorsAnalysis(TextInput, Arguments): # Accepts a list of words and ArgumentsParsing output
+    'Finding words similar to the queries without any dialogues'
+    NLP = NLPLoading(Arguments.model)
+    Queries = [word.strip().lower() for word in (Arguments.query or '').split(',') if word.strip()]
+    QueryVectors = [NLP.make_doc(word).vector for word in Queries] # Multi-word queries get the average vector
+    Results = SimilarityCalc(SimilarityEngine(NLP, TextInput), QueryVectors, Threshold=Arguments.similarity, TopK=SimilarityTopK)
+    return dict(zip(Queries, Results)), TracingTaking() # Returns a dictionary of dictionaries, one per query, and the stage measurements
+
+def BatchRunning(Filenames, Arguments, Pool): # Accepts a list of filenames, ArgumentsParsing output and a process pool
+    'Processing many files at once and adding up the results'
+    # Map: every file is counted in a pool of worker processes
+    # Reduce: the counts are added up as soon as the files are done
+    Report = {'files': {}, 'aggregate': {}, 'similar': {}, 'totals': {}, 'errors': {}, 'trace': []}
+    Total = {}
+    Futures = {Pool.submit(FileAnalysis, FilenameInput, Arguments): FilenameInput for FilenameInput in Filenames}
+    for Future in as_completed(Futures):
+        try:
+            FilenameInput, Result, Records = Future.result()
+        except Exception as e: # Reading, decoding and model loading errors are reported per file
+            print(f"An error occurred while processing {Futures[Future]}: {e!r}")
+            Report['errors'][Futures[Future]] = repr(e)
+            continue # Proceeds to the next file
+        Report['trace'].extend(Records)
+        for ComboNumber, Counts in Result.items():
+            Total.setdefault(ComboNumber, CounterMaking(Backend=Arguments.counter)).update(Counts) # Approximate counts are merged by their own rules
+        Report['files'][FilenameInput] = {ComboNumber: FrequencyFiltering(Counts, Arguments.threshold, TopK=Arguments.top) for ComboNumber, Counts in Result.items()}
+        Report['totals'][FilenameInput] = {ComboNumber: getattr(Counts, 'Total', None) or sum(Counts.values()) for ComboNumber, Counts in Result.items()}
+        print(f"Processed {FilenameInput} ({len(Report['files'])} of {len(Filenames)})")
+    Report['aggregate'] = {ComboNumber: FrequencyFiltering(Counts, Arguments.threshold, TopK=Arguments.top) for ComboNumber, Counts in Total.items()}
+    Report['totals']['aggregate'] = {ComboNumber: getattr(Counts, 'Total', None) or sum(Counts.values()) for ComboNumber, Counts in Total.items()}
+    if Arguments.mode == 'vectors' and Total:
+        Report['similar'], Records = Pool.submit(VectorsAnalysis, list(Report['aggregate'][1]), Arguments).result() # A worker has the model loaded already
+        Report['trace'].extend(Records)
+    return Report # Returns dictionary
+
+def BatchReport(Name, TextInput, Totals, Arguments): # Accepts a label, a dictionary of dictionaries, a dictionary of numbers and ArgumentsParsing output
+    'Printing or storing the results of a file or of all the files'
+    for ComboNumber, SortedText in TextInput.items():
+        if Arguments.output is None:
+            print(f"{Name} ({'words' if Arguments.mode != 'combos' else f'{ComboNumber}-word combinations'}): {Totals.get(ComboNumber, len(SortedText))} in total, {len(SortedText)} above the threshold")
+            continue # Proceeds to the next combination number
+        Suffix = 'words' if Arguments.mode != 'combos' else f'combos-{ComboNumber}'
+        SafeName = regex.sub(r'[^\w.-]+', '_', Name) # Files from different directories may share the same name
+        FilenameOutput = os.path.join(Arguments.output, f"{SafeName}.{Suffix}.{Arguments.format}")
+        ResultWriting(SortedText, FilenameOutput)
+
+def BatchReporting(Report, Arguments): # Accepts BatchRunning output and ArgumentsParsing output
+    'Printing or storing the results of all the files'
+    if Arguments.output is not None:
+        os.makedirs(Arguments.output, exist_ok=True)
+    for FilenameInput, Result in Report['files'].items():
+        BatchReport(os.path.relpath(FilenameInput), Result, Report['totals'][FilenameInput], Arguments)
+    BatchReport('aggregate', Report['aggregate'], Report['totals'].get('aggregate', {}), Arguments)
+    for Query, SortedText in Report['similar'].items():
+        BatchReport(f'similar to {Query}', {1: SortedText}, {}, Arguments)
+    if Arguments.output is None: # Shows the top of the aggregate result just like the 'top' option does
+        for SortedText in list(Report['aggregate'].values()) + list(Report['similar'].values()):
+            for word, value in islice(SortedText.items(), 25):
+                print(f'Word: {word}, Value: {value}')
+    for FilenameInput, Error in Report['errors'].items():
+        print(f"Failed: {FilenameInput}: {Error}")
+    print(f"Done: {len(Report['files'])} files processed, {len(Report['errors'])} failed.")
+    return 1 if Report['errors'] else 0 # Returns the exit code
+
+def BatchMain(Arguments): # Accepts ArgumentsParsing output
+    'Processing many files at once without any dialogues'
+    Filenames = []
+    for Pattern in Arguments.files:
+        Filenames.extend(sorted(glob.glob(Pattern, recursive=True)) or [Pattern]) # Patterns matching nothing are kept for the error to be reported
+    Filenames = [os.path.abspath(FilenameInput) for FilenameInput in Filenames] # The daemon may run in another directory
+    Report = None if Arguments.local else DaemonRequest(Filenames, Arguments)
+    if Report is None:
+        print(f"Processing {len(Filenames)} files with {Arguments.workers} workers...")
+        with ProcessPoolExecutor(max_workers=Arguments.workers, initializer=TracingStarting, initargs=(dict(TracingSettings),)) as Pool:
+            Report = BatchRunning(Filenames, Arguments, Pool)
+    TracingRecords.extend(Report['trace']) # Measurements of the worker processes (or of the daemon if it traces)
+    if Arguments.plot and Report['aggregate']:
+        BatchPlotting(Report, Arguments)
+    return BatchReporting(Report, Arguments) # Returns the exit code
+
+def BatchPlotting(Report, Arguments): # Accepts BatchRunning output and ArgumentsParsing output
+    'Storing the graphs of the aggregate result without any dialogues'
+    NLP = NLPLoading(Arguments.model)
+    if NLP.vocab.vectors.size == 0: # Small models have no word vectors
+        print("The selected model has no word vectors to plot. Please use the 'lg' or 'md' model for the graph.")
+        return # Exits the function
+    if Arguments.mode == 'words':
+        PlottingTheGraph(Report['aggregate'][1], WordVectors(NLP, Report['aggregate'][1]), FilenameOutput=Arguments.plot)
+    Root, Extension = os.path.splitext(Arguments.plot)
+    for Query, SortedText in Report['similar'].items(): # A graph per query in the vectors mode
+        SafeQuery = regex.sub(r'[^\w.-]+', '_', Query)
+        PlottingTheGraph(SortedText, WordVectors(NLP, SortedText), FilenameOutput=f'{Root}.{SafeQuery}{Extension}')
+
+def ReportEncoding(Report): # Accepts BatchRunning output
+    'Turning the results into JSON'
+    # Dictionaries become lists of [word, value] pairs to keep their order, word combinations become lists
+    Pairs = lambda SortedText: [[list(word) if isinstance(word, tuple) else word, value] for word, value in SortedText.items()]
+    return json.dumps({
+        'files': {FilenameInput: {ComboNumber: Pairs(SortedText) for ComboNumber, SortedText in Result.items()} for FilenameInput, Result in Report['files'].items()},
+        'aggregate': {ComboNumber: Pairs(SortedText) for ComboNumber, SortedText in Report['aggregate'].items()},
+        'similar': {Query: Pairs(SortedText) for Query, SortedText in Report['similar'].items()},
+        'totals': Report['totals'],
+        'errors': Report['errors'],
+        'trace': Report['trace'],
+    }, ensure_ascii=False) # Returns string
+
+def ReportDecoding(TextInput): # Accepts ReportEncoding output
+    'Turning JSON back into the results'
+    Data = json.loads(TextInput)
+    Pairs = lambda Pairs: {tuple(word) if isinstance(word, list) else word: value for word, value in Pairs}
+    return {
+        'files': {FilenameInput: {int(ComboNumber): Pairs(SortedText) for ComboNumber, SortedText in Result.items()} for FilenameInput, Result in Data['files'].items()},
+        'aggregate': {int(ComboNumber): Pairs(SortedText) for ComboNumber, SortedText in Data['aggregate'].items()},
+        'similar': {Query: Pairs(SortedText) for Query, SortedText in Data['similar'].items()},
+        'totals': {Name: {int(ComboNumber): Total for ComboNumber, Total in Totals.items()} for Name, Totals in Data['totals'].items()},
+        'errors': Data['errors'],
+        'trace': Data['trace'],
+    } # Returns dictionary
+
+def ArgumentsFormatting(Arguments): # Accepts ArgumentsParsing output
+    'Turning the job options back into command line arguments for the daemon'
+    Options = ['--mode', Arguments.mode, '--profile', Arguments.profile, '--model', Arguments.model, '--filter', Arguments.filter]
+    Options += ['--combo', f'{Arguments.combo.start}-{Arguments.combo.stop - 1}', '--threshold', str(Arguments.threshold), '--similarity', str(Arguments.similarity), '--counter', Arguments.counter]
+    if Arguments.top is not None:
+        Options += ['--top', str(Arguments.top)]
+    if Arguments.exclude:
+        Options += ['--exclude', Arguments.exclude]
+    if Arguments.query:
+        Options += ['--query', Arguments.query]
+    return Options # Returns list
+
+class DaemonConnection(http.client.HTTPConnection):
+    'Connecting to the daemon over its Unix socket'
+    def __init__(self, Path, Timeout=None): # Accepts the socket path and an optional number of seconds
+        super().__init__('localhost', timeout=Timeout)
+        self.Path = Path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.Path)
+
+def DaemonConnecting(Arguments, Timeout=None): # Accepts ArgumentsParsing output and an optional number of seconds
+    'Opening a connection to the daemon'
+    if DaemonUnix:
+        return DaemonConnection(Arguments.socket, Timeout) # Returns http.client.HTTPConnection
+    return http.client.HTTPConnection('127.0.0.1', Arguments.port, timeout=Timeout) # Sends the Host header the daemon expects
+
+def DaemonRequest(Filenames, Arguments): # Accepts a list of filenames and ArgumentsParsing output
+    'Handing the job over to the daemon if it is running'
+    # Returns None if there's no daemon, it's busy or it fails the job to process the files locally instead
+    # Only the standard library is needed up to this point so a run handed over to the daemon starts right away
+    Headers = {'Content-Type': 'application/json'}
+    try:
+        if DaemonUnix: # Another user could have made the directory first in the shared temporary directory and be listening there
+            DaemonChecking(os.path.dirname(os.path.abspath(Arguments.socket)), stat.S_ISDIR, 0o077)
+            DaemonChecking(Arguments.socket, stat.S_ISSOCK, 0o077)
+        else:
+            with open(DaemonTokenFile, 'r', encoding='utf-8') as filein: # Written by the daemon, readable by its user only
+                Headers['X-QuickNLPFreqTool-Token'] = filein.read().strip()
+        Connection = DaemonConnecting(Arguments, Timeout=1)
+        Connection.request('GET', '/status', headers=Headers)
+        Status = Connection.getresponse()
+        Status.read()
+        Connection.close()
+    except PermissionError as e: # Not the daemon of this user
+        print(f"{e}, processing the files locally...")
+        return None
+    except (OSError, http.client.HTTPException): # Nobody's listening
+        return None
+    if Status.status != 200:
+        print(f"The daemon doesn't accept the jobs ({Status.status} {Status.reason}), processing the files locally...")
+        return None
+    print(f"Sending {len(Filenames)} files to the daemon...")
+    Job = json.dumps({'arguments': ArgumentsFormatting(Arguments), 'files': Filenames}).encode('utf-8')
+    try:
+        Connection = DaemonConnecting(Arguments)
+        Connection.request('POST', '/jobs', body=Job, headers=Headers)
+        Response = Connection.getresponse()
+        Body = Response.read().decode('utf-8', 'replace')
+        Connection.close()
+    except (OSError, http.client.HTTPException) as e: # The daemon has stopped halfway
+        print(f"Lost the connection to the daemon ({e}), processing the files locally...")
+        return None
+    if Response.status == 503:
+        print("The daemon is busy, processing the files locally...")
+        return None
+    if Response.status != 200:
+        print(f"The daemon failed the job: {Response.status} {Body}")
+        print("Processing the files locally...")
+        return None
+    return ReportDecoding(Body) # Returns BatchRunning output
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    'Answering the requests to the daemon'
+    # GET /status tells the clients that the daemon is up
+    # POST /jobs takes {"arguments": [...], "files": [...]} and returns the results as JSON (see the ReportEncoding function)
+    # The daemon reads any file its user can read so every request has to come from that user (see the Refusing method)
+    def Refusing(self):
+        'Turning down the requests that may come from other users or from web pages'
+        # The Unix socket is accessible to the daemon user only, so is the token file when the daemon listens on a port
+        # Any local user or a web page may connect to a port, so the token is required and the Host header has to be the exact address to defeat DNS rebinding
+        # JSON is required as well since web pages can't send it to another address without the daemon agreeing to it first
+        Reason = None
+        if self.server.Token is not None and self.headers.get('Host') != f'127.0.0.1:{self.server.server_address[1]}':
+            Reason = 403, 'unexpected host'
+        elif self.server.Token is not None and not hmac.compare_digest(self.headers.get('X-QuickNLPFreqTool-Token', '').encode('utf-8'), self.server.Token.encode('utf-8')):
+            Reason = 403, 'invalid token'
+        elif self.command == 'POST' and self.headers.get_content_type() != 'application/json':
+            Reason = 415, 'JSON expected'
+        if Reason is not None:
+            self.Answering(Reason[0], {'error': Reason[1]})
+        return Reason is not None # Returns boolean
+
+    def address_string(self): # Unix socket clients have no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'local'
+
+    def do_GET(self):
+        if self.Refusing():
+            return
+        if self.path != '/status':
+            return self.Answering(404, {'error': 'not found'})
+        self.Answering(200, {'version': ScriptVersion, 'workers': self.server.Workers, 'preloaded': self.server.Preloaded})
+
+    def do_POST(self):
+        if self.Refusing():
+            return
+        if self.path != '/jobs':
+            return self.Answering(404, {'error': 'not found'})
+        if not self.server.Slots.acquire(blocking=False): # Bounded number of jobs at once, the clients process the files themselves otherwise
+            return self.Answering(503, {'error': 'busy'})
+        try:
+            Job = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            try:
+                Arguments = ArgumentsParsing(Job['arguments'] + ['--'] + Job['files'])
+            except SystemExit: # argparse has printed the reason already
+                return self.Answering(400, {'error': 'invalid arguments'})
+            self.Answering(200, ReportEncoding(BatchRunning(Arguments.files, Arguments, self.server.Pool)))
+        except Exception as e:
+            self.Answering(500, {'error': repr(e)})
+        finally:
+            self.server.Slots.release()
+
+    def Answering(self, Code, Content): # Accepts an HTTP status code and a dictionary or a JSON string
+        Body = (Content if isinstance(Content, str) else json.dumps(Content)).encode('utf-8')
+        self.send_response(Code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(Body)))
+        self.end_headers()
+        self.wfile.write(Body)
+
+class DaemonUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    'Serving the daemon requests over a Unix socket'
+    daemon_threads = True
+
+    def server_bind(self):
+        Mask = os.umask(0o177) # The socket is created with 0600 permissions right away, there's no moment anyone else could connect
+        try:
+            super().server_bind()
+        finally:
+            os.umask(Mask)
+
+def DaemonDirectoryMaking(): # Accepts nothing
+    'Making the directory for the daemon socket and token that only its user may enter'
+    os.makedirs(DaemonDirectory, mode=0o700, exist_ok=True)
+    DaemonChecking(DaemonDirectory, stat.S_ISDIR, 0o077) # Someone else may have made it first in the shared temporary directory
+
+def DaemonChecking(Path, Kind, Mask): # Accepts a path, stat.S_ISDIR or stat.S_ISSOCK and the permission bits nobody else may have
+    'Making sure a path of the daemon belongs to this user and nobody else may use it'
+    # Symbolic links aren't followed so they can't point anywhere else
+    if not hasattr(os, 'getuid'):
+        return # Exits the function, there are no owners to compare on Windows (the token file is used there)
+    Status = os.lstat(Path)
+    if not Kind(Status.st_mode) or Status.st_uid != os.getuid() or Status.st_mode & Mask:
+        raise PermissionError(f"{Path} has to be {'a directory' if Kind is stat.S_ISDIR else 'a socket'} of this user that nobody else may access")
+
+def DaemonWorkerReady(): # Accepts nothing
+    'Telling the daemon a worker has started (see the DaemonPool class)'
+    return os.getpid() # Returns number
+
+class DaemonPool:
+    'Keeping the daemon worker processes running with the models loaded'
+    # Workers are started and load the models before the daemon accepts any job, ProcessPoolExecutor would only start them on the first one otherwise
+    # They are spawned rather than forked since the daemon has threads running by then (forking a threaded process may deadlock)
+    # A worker that crashes (killed or out of memory) breaks the whole pool, so it's replaced by a new one when the next job comes
+    def __init__(self, Arguments): # Accepts ArgumentsParsing output
+        self.Arguments = Arguments
+        self.Lock = threading.Lock()
+        self.Pool = self.Starting()
+
+    def Starting(self):
+        'Starting the workers and waiting until they have loaded the models'
+        Context = multiprocessing.get_context('spawn')
+        Ready = Context.Barrier(self.Arguments.workers) # No worker takes a task before all of them have loaded the models
+        Pool = ProcessPoolExecutor(max_workers=self.Arguments.workers, mp_context=Context, initializer=DaemonWorkerStarting, initargs=(self.Arguments.preload, dict(TracingSettings), Ready))
+        for Future in [Pool.submit(DaemonWorkerReady) for _ in range(self.Arguments.workers)]: # A worker is started for every task while none of them is idle
+            Future.result()
+        return Pool # Returns ProcessPoolExecutor
+
+    def submit(self, Function, *Arguments):
+        Pool = self.Pool
+        try:
+            return Pool.submit(Function, *Arguments) # Returns concurrent.futures.Future
+        except BrokenProcessPool:
+            with self.Lock:
+                if self.Pool is Pool: # Not replaced by another job yet
+                    print("A daemon worker has crashed, starting the workers anew...")
+                    Pool.shutdown(wait=False, cancel_futures=True)
+                    self.Pool = self.Starting()
+            return self.Pool.submit(Function, *Arguments) # Returns concurrent.futures.Future
+
+    def shutdown(self):
+        self.Pool.shutdown(wait=True, cancel_futures=True)
+
+def DaemonWorkerStarting(ModelNames, Settings, Ready): # Accepts a list of spaCy model names or paths, TracingSettings of the daemon and a multiprocessing barrier
+    'Loading the models in a daemon worker process before the first job'
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C stops the daemon itself, it shuts the workers down then
+    TracingStarting(Settings) # Jobs are traced if the daemon is, the measurements are sent along with the results
+    for ModelName in ModelNames:
+        NLPLoading(ModelName)
+    Ready.wait()
+
+def DaemonMain(Arguments): # Accepts ArgumentsParsing output
+    'Running the daemon that keeps the models loaded between the jobs'
+    # Models stay loaded in the worker processes as long as the daemon runs so only the first job with a model pays for loading it
+    # The daemon reads any file its user can read so only that user may send it jobs: through a Unix socket with 0600 permissions
+    # or, where there are none, through a local port with a random token stored in a file only that user can read
+    DaemonDirectoryMaking()
+    if DaemonUnix:
+        with contextlib.suppress(OSError), contextlib.closing(DaemonConnecting(Arguments, Timeout=1)) as Connection:
+            Connection.connect()
+            print(f"The daemon is already running at {Arguments.socket}.")
+            return 1 # Returns the exit code
+        with contextlib.suppress(FileNotFoundError): # Left by a daemon that hasn't stopped cleanly
+            os.remove(Arguments.socket)
+        Server = DaemonUnixServer(Arguments.socket, DaemonRequestHandler)
+        Server.Token = None
+        Address, Cleanup = Arguments.socket, Arguments.socket
     else:
-        print("Invalid choice. Please enter either 'words' or 'combos' or 'vectors'.") # Restarts the loop
+        Server = ThreadingHTTPServer(('127.0.0.1', Arguments.port), DaemonRequestHandler)
+        Server.Token = secrets.token_urlsafe(32)
+        with open(os.open(DaemonTokenFile, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w', encoding='utf-8') as fileout:
+            fileout.write(Server.Token)
+        Address, Cleanup = f'127.0.0.1:{Arguments.port}', DaemonTokenFile
+    Server.Workers = Arguments.workers
+    Server.Preloaded = Arguments.preload
+    Server.Slots = threading.BoundedSemaphore(DaemonConcurrency)
+    try:
+        print(f"Starting {Arguments.workers} workers{' and loading ' + ', '.join(Arguments.preload) if Arguments.preload else ''}...")
+        Server.Pool = DaemonPool(Arguments) # Before any request is served, so the first job doesn't wait for the models
+        print(f"QuickNLPFreqTool daemon is listening at {Address} with {Arguments.workers} workers, press Ctrl+C to stop it...")
+        Server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping the daemon...")
+    except BrokenProcessPool: # The workers have printed the reason, e.g. a model that can't be loaded
+        print("The daemon workers couldn't start.")
+        return 1 # Returns the exit code
+    finally:
+        Server.server_close()
+        with contextlib.suppress(OSError):
+            os.remove(Cleanup)
+        if hasattr(Server, 'Pool'):
+            Server.Pool.shutdown()
+    return 0 # Returns the exit code
+
+def ArgumentsParsing(Arguments): # Accepts a list of command line arguments
+    'Reading the command line options for the batch mode'
+    Parser = argparse.ArgumentParser(description="Without arguments the script runs its usual dialogues. With files (or glob patterns) it processes all of them without any dialogues and adds up the results.", fromfile_prefix_chars='@', epilog="Options and files may also be listed one per line in a file passed as @filename.")
+    Parser.add_argument('files', nargs='*', help="Text files encoded with UTF-8 or glob patterns such as 'corpus/**/*.txt'")
+    Parser.add_argument('--mode', choices=['words', 'combos', 'vectors'], default='words', help="What to count (default: words), the vectors mode finds words similar to --query among the frequent ones of all the files")
+    Parser.add_argument('--profile', choices=list(NormalizationProfiles), help="Text preparation option, same as in the dialogue ('en' is either 'en-basic' or 'en-extended')")
+    Parser.add_argument('--model', help="SpaCy model name or path, e.g. ru_core_news_sm")
+    Parser.add_argument('--filter', choices=['y', 'n'], default='n', help="y: Leave only nouns, adjectives, verbs, and adverbs, n: Filter nothing (default)")
+    Parser.add_argument('--exclude', help="Comma-separated parts of speech to filter out instead, e.g. PRON,ADP,DET")
+    Parser.add_argument('--combo', type=ComboRangeParsing, default=range(2, 3), help="Combination number or range for the combos mode, e.g. 3 or 2-5 (default: 2)")
+    Parser.add_argument('--threshold', type=int, default=1, help="No results with a frequency lower than it will be stored (default: 1)")
+    Parser.add_argument('--top', type=int, help="Keep only this many of the most frequent results of every file and of the aggregate")
+    Parser.add_argument('--counter', choices=list(CountingBackends), default=CountingBackend, help=f"Counting backend, the approximate ones use a fixed amount of memory (default: {CountingBackend})")
+    Parser.add_argument('--query', help="Comma-separated words to find similar words to in the vectors mode")
+    Parser.add_argument('--similarity', type=int, default=0, help="No results with a similarity (in percent) lower than it will be stored in the vectors mode (default: 0)")
+    Parser.add_argument('--workers', type=int, default=ParsingProcesses, help=f"Number of worker processes (default: {ParsingProcesses})")
+    Parser.add_argument('--output', help="Directory to store the results of every file and the aggregate result in, otherwise only a summary is printed")
+    Parser.add_argument('--format', choices=[Format[1:] + Compression for Format in ResultFormats for Compression in ('', '.gz', '.zst') if Format != '.qnf' or not Compression], default='txt', help="Format of the stored results (default: txt, the same as in the dialogues)")
+    Parser.add_argument('--plot', metavar='FILE', help="Store the graph of the aggregate result (or of every query in the vectors mode) in a .png or .svg file, no display is needed")
+    Parser.add_argument('--trace', nargs='?', const=time.strftime('QuickNLPFreqTool-trace-%Y%m%d-%H%M%S.json'), metavar='FILE', help="Measure the time and memory every stage takes and store the measurements in a JSON file (works with the dialogues as well)")
+    Parser.add_argument('--trace-cprofile', choices=TracingStages, metavar='STAGE', help=f"Run cProfile within a single stage when tracing: {', '.join(TracingStages)}")
+    Parser.add_argument('--trace-memory', choices=TracingStages, metavar='STAGE', help="Run tracemalloc within a single stage when tracing and record the top allocations")
+    Parser.add_argument('--serve', action='store_true', help="Run the daemon that keeps the models loaded, batch runs hand their files over to it while it's up")
+    Parser.add_argument('--preload', nargs='*', default=[], metavar='MODEL', help="Models the daemon workers load right away")
+    Parser.add_argument('--socket', default=DaemonSocket, help=f"Unix socket of the daemon (default: {DaemonSocket})")
+    Parser.add_argument('--port', type=int, default=DaemonPort, help=f"Local port of the daemon where there are no Unix sockets, e.g. on Windows (default: {DaemonPort})")
+    Parser.add_argument('--local', action='store_true', help="Process the files locally even if the daemon is up")
+    Arguments = Parser.parse_args(Arguments)
+    if Arguments.files and (Arguments.profile is None or Arguments.model is None):
+        Parser.error("--profile and --model are required when files are given")
+    if (Arguments.trace_cprofile or Arguments.trace_memory) and not Arguments.trace:
+        Parser.error("--trace-cprofile and --trace-memory require --trace")
+    if Arguments.plot and Arguments.mode == 'combos':
+        Parser.error("--plot is only available in the words and vectors modes")
+    if Arguments.files and Arguments.mode == 'vectors' and not Arguments.query:
+        Parser.error("--query is required in the vectors mode")
+    return Arguments # Returns argparse.Namespace
+
+# Actual program starts here
+# The guard is needed for the parsing and batch processes which may import the script anew on some platforms
+if __name__ == '__main__':
+    CommandLine = ArgumentsParsing(sys.argv[1:])
+    if CommandLine.trace:
+        TracingStarting({'file': CommandLine.trace, 'cprofile': CommandLine.trace_cprofile, 'memory': CommandLine.trace_memory})
+        atexit.register(TracingWriting, time.time())
+    if CommandLine.serve:
+        sys.exit(DaemonMain(CommandLine)) # Exits the script
+    if CommandLine.files:
+        sys.exit(BatchMain(CommandLine)) # Exits the script
+    InteractiveMain()
@@ -0,0 +1,40 @@
+# Least recently used cache entries removed while another process may be evicting the same ones
+# Run from the repository directory: python -m pytest tests
+
+import os # Standard library utilized for the script path and the cache entries
+import sys # Standard library utilized for the script path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import QuickNLPFreqTool as Tool # The script being tested
+
+def Entries(Directory, Count): # Accepts a directory and a number
+    'Making cache entries of 100 bytes, the first one is the oldest'
+    Paths = []
+    for i in range(Count):
+        Path = os.path.join(Directory, f'entry{i}.npz')
+        with open(Path, 'wb') as fileout:
+            fileout.write(b'\0' * 100)
+        os.utime(Path, (1000 + i, 1000 + i))
+        Paths.append(Path)
+    return Paths # Returns list
+
+def test_oldest_entries_are_removed_first(monkeypatch, tmp_path):
+    monkeypatch.setattr(Tool, 'CacheDirectory', str(tmp_path))
+    monkeypatch.setattr(Tool, 'CacheSizeLimit', 250)
+    Paths = Entries(tmp_path, 5)
+    Tool.CacheEviction(Paths[-1])
+    assert [os.path.exists(Path) for Path in Paths] == [False, False, False, True, True]
+
+def test_entries_evicted_by_another_process_are_skipped(monkeypatch, tmp_path):
+    monkeypatch.setattr(Tool, 'CacheDirectory', str(tmp_path))
+    monkeypatch.setattr(Tool, 'CacheSizeLimit', 250)
+    Paths = Entries(tmp_path, 5)
+    Listing = os.listdir
+    monkeypatch.setattr(Tool.os, 'listdir', lambda Directory: Listing(Directory) + ['gone.npz']) # Removed between the listing and the look at it
+    Removing = os.remove
+    def RemovingTwice(Path): # The other process gets to the same entry first
+        Removing(Path)
+        Removing(Path)
+    monkeypatch.setattr(Tool.os, 'remove', RemovingTwice)
+    Tool.CacheEviction(Paths[-1])
+    assert [os.path.exists(Path) for Path in Paths] == [False, False, False, True, True]
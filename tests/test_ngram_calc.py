@@ -0,0 +1,43 @@
+# Word combinations counted over lemma IDs compared with the plain list of tuples, with and without pruning
+# Run from the repository directory: python -m pytest tests
+
+import os # Standard library utilized for the script path
+import sys # Standard library utilized for the script path
+import random # Standard library utilized to generate the lemma IDs
+from collections import Counter # Standard library utilized for the reference counts
+import pytest # Test runner
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import QuickNLPFreqTool as Tool # The script being tested
+
+def Combos(TextInput, ComboNumber): # Accepts a list and a number
+    'Counting the word combinations the way the script did before they were counted over IDs'
+    return Counter(tuple(TextInput[i:i + ComboNumber]) for i in range(len(TextInput) - (ComboNumber - 1)))
+
+@pytest.mark.parametrize('SegmentSize', [1, 7, 1000000])
+def test_segments_give_exact_counts(monkeypatch, SegmentSize):
+    monkeypatch.setattr(Tool, 'NGramSegmentSize', SegmentSize)
+    Generator = random.Random(SegmentSize)
+    LemmaIDs = [Generator.randrange(20) for _ in range(3000)]
+    for ComboNumber, Counts in Tool.NGramCalc(LemmaIDs, range(1, 5)):
+        assert Counts == Combos(LemmaIDs, ComboNumber)
+
+def test_pruning_keeps_half_the_limit_on_ties(monkeypatch):
+    monkeypatch.setattr(Tool, 'NGramSegmentSize', 10)
+    LemmaIDs = list(range(100)) # Every combination is seen once so all the counts are tied
+    Counts = dict(Tool.NGramCalc(LemmaIDs, [2], PruneLimit=4))[2]
+    assert len(Counts) == 2 + 10 - 1 # The 2 kept before the last segment and its 9 combinations, the last segment isn't pruned
+
+def test_pruning_never_overestimates_and_keeps_the_frequent(monkeypatch):
+    monkeypatch.setattr(Tool, 'NGramSegmentSize', 500)
+    Generator = random.Random(1)
+    LemmaIDs = [Generator.randrange(30) for _ in range(5000)]
+    Exact = Combos(LemmaIDs, 2)
+    Counts = dict(Tool.NGramCalc(LemmaIDs, [2], PruneLimit=200))[2]
+    assert all(freq <= Exact[Combo] for Combo, freq in Counts.items())
+    assert all(Combo in Counts for Combo, freq in Exact.most_common(20))
+
+def test_no_pruning_within_a_single_segment():
+    Generator = random.Random(2)
+    LemmaIDs = [Generator.randrange(30) for _ in range(5000)]
+    assert dict(Tool.NGramCalc(LemmaIDs, [2], PruneLimit=10))[2] == Combos(LemmaIDs, 2)
@@ -0,0 +1,83 @@
+# Randomized comparison of the block-by-block text preparation with the original regular expressions chain
+# Run from the repository directory: python -m pytest tests
+
+import os # Standard library utilized for the script path
+import sys # Standard library utilized for the script path
+import random # Standard library utilized to generate the texts and block sizes
+import time # Standard library utilized to measure how the time grows with the text
+import regex # Regular expressions (the original text preparation)
+import pytest # Test runner
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import QuickNLPFreqTool as Tool # The script being tested
+
+# Characters the texts are made of: Cyrillic and Latin letters, ё written both ways, combining marks, hyphen variations, line ends and stray characters
+Alphabet = list('абвежЕеАБZaz09.,!?:éßœ@#«»…§') + [
+    'ё', 'Ё', 'е\u0308', 'Е\u0308', '\u0306', '\u0308',
+    '-', '\u2012', '\u2013', '\u2014', '\u2015',
+    ' ', '  ', '\t', '\n', '\r\n', '\r', '\u00A0', '\u3000',
+]
+Cases = 2000 # Random texts per profile
+
+def OriginalPreparation(TextInput, Profile): # Accepts a string and one of the NormalizationProfiles keys
+    'Preparing the text the way the script did before it was streamed'
+    if Profile == 'ru':
+        TextInput = regex.sub(r'[^а-яА-ЯёЁ0-9.,!?:\s\n\r\u002D\u2012\u2013\u2014\u2015\u0306\u0308]+', '', TextInput) # Leaves only basic punctuation and Cyrillic characters
+    elif Profile == 'en-basic':
+        TextInput = regex.sub(r'[^a-zA-Z0-9.,!?:\s\n\r\u002D\u2012\u2013\u2014\u2015]+', '', TextInput) # Leaves only basic punctuation and basic Latin characters
+    elif Profile == 'en-extended':
+        TextInput = regex.sub(r'[^\p{Latin}0-9.,!?:\s\n\r\u002D\u2012\u2013\u2014\u2015]+', '', TextInput) # Leaves only basic punctuation and Latin characters
+    TextInput = regex.sub(r'[\r\n]+', ' ', TextInput) # Replaces end-of-lines with spaces
+    TextInput = regex.sub(r'[\u002D\u2012\u2013\u2014\u2015]+', '-', TextInput) # Replaces some annoying hyphen variations with a regular one
+    TextInput = regex.sub(r'\s{2,}', ' ', TextInput) # Replaces multiple spaces with a single space
+    if Profile == 'ru':
+        TextInput = TextInput.replace('ё', 'е').replace('Ё', 'Е').replace('е\u0308', 'е').replace('Е\u0308', 'Е')
+    return TextInput # Returns string
+
+def Blocks(TextInput, Generator): # Accepts a string and a random.Random object
+    'Cutting the text into blocks of random sizes'
+    Position = 0
+    while Position < len(TextInput):
+        Size = Generator.randint(1, 40)
+        yield TextInput[Position:Position + Size]
+        Position += Size
+
+@pytest.mark.parametrize('Profile', list(Tool.NormalizationProfiles))
+def test_text_normalization_matches_original(Profile):
+    Generator = random.Random(f'normalization-{Profile}')
+    for Case in range(Cases):
+        TextInput = ''.join(Generator.choices(Alphabet, k=Generator.randint(0, 200)))
+        Output = ''.join(Tool.TextNormalization(Blocks(TextInput, Generator), Profile))
+        assert Output == OriginalPreparation(TextInput, Profile), f'case {Case}: {TextInput!r}'
+
+@pytest.mark.parametrize('Profile', list(Tool.NormalizationProfiles))
+def test_text_reading_and_normalization_match_original(Profile, tmp_path):
+    Generator = random.Random(f'reading-{Profile}')
+    Filename = tmp_path / 'sample.txt'
+    Filename.write_bytes(''.join(Generator.choices(Alphabet, k=20000)).encode('utf-8'))
+    with open(Filename, 'r', encoding='utf-8') as filein: # The file as the original script read it
+        Expected = OriginalPreparation(filein.read(), Profile)
+    for BlockSize in (1, 7, 64, 4096):
+        assert ''.join(Tool.TextNormalization(Tool.TextReading(Filename, BlockSize), Profile)) == Expected
+
+@pytest.mark.parametrize('Profile, Words', [
+    ('ru', ['abc', 'de', 'fgh']), # Latin text has nothing the 'ru' profile keeps but the spaces
+    ('en-basic', ['где', 'ёж', 'на']), # And the other way round
+    ('ru', ['е', 'ё', '-', 'Ё']), # Only characters a replacement may span across
+    ('skip', ['-', '–', '\n']),
+])
+def test_text_normalization_scales_linearly_without_boundaries(Profile, Words):
+    # Once no character can be cut after the carried text must not grow with the file, the time would grow quadratically otherwise
+    Generator = random.Random(f'scaling-{Profile}')
+    TextInput = ' '.join(Generator.choices(Words, k=1 << 19))
+    assert ''.join(Tool.TextNormalization(Blocks(TextInput[:20000], Generator), Profile)) == OriginalPreparation(TextInput[:20000], Profile)
+    Timings = []
+    for Size in (len(TextInput) // 4, len(TextInput)):
+        Best = float('inf')
+        for Repeat in range(3):
+            Start = time.perf_counter()
+            for Chunk in Tool.TextNormalization((TextInput[i:i + 4096] for i in range(0, Size, 4096)), Profile):
+                pass
+            Best = min(Best, time.perf_counter() - Start)
+        Timings.append(Best)
+    assert Timings[1] < Timings[0] * 8 # About 4 times longer for 4 times more text, 16 times if it were quadratic